@@ -1,23 +1,20 @@
-import pygame
 import heapq
+import time
+from search import reconstruct_path
+from search_agent import SearchAgent
+
+class Agent1(SearchAgent):
+    bidirectional_heuristic = True  # Bidirectional A* on balanced Manhattan potentials
+    no_path_cost = 0  # An unreachable task adds nothing to the heuristic
 
-class Agent1(pygame.sprite.Sprite):
     def __init__(self, environment, grid_size):
-        super().__init__()
-        self.image = pygame.Surface((grid_size, grid_size))
-        self.image.fill((0, 0, 255))  # Agent color is blue
-        self.rect = self.image.get_rect()
-        self.grid_size = grid_size
-        self.environment = environment
-        self.position = [0, 0]  # Starting at the top-left corner of the grid
-        self.rect.topleft = (0, 0)
-        self.task_completed = 0
-        self.completed_tasks = []
-        self.path = []  # List of positions to follow
-        self.moving = False  # Flag to indicate if the agent is moving
+        super().__init__(environment, grid_size)
         self.total_heuristic = 0  # Store the total Manhattan distance
-        self.total_path_cost = 0  # Store the total path cost
-        self.completed_tasks_with_costs = []  # Store completed tasks with their costs
+
+    def reset(self):
+        """Put the agent back on the start cell with no progress, path or plan."""
+        super().reset()
+        self.total_heuristic = 0
 
     @staticmethod
     def heuristic(a, b):
@@ -26,75 +23,79 @@ class Agent1(pygame.sprite.Sprite):
         (x2, y2) = b
         return abs(x1 - x2) + abs(y1 - y2)
 
-    def move(self):
-        """Move the agent along the path."""
-        if self.path:
-            next_position = self.path.pop(0)
-            self.position = list(next_position)
-            self.rect.topleft = (self.position[0] * self.grid_size, self.position[1] * self.grid_size)
-            self.check_task_completion()
-        else:
-            self.moving = False  # Stop moving when path is exhausted
+    def begin_task(self, path, heuristic_value):
+        self.total_heuristic = heuristic_value  # Update the total heuristic
 
-    def check_task_completion(self):
-        """Check if the agent has reached a task location."""
-        position_tuple = tuple(self.position)
-        if position_tuple in self.environment.task_locations:
-            task_number = self.environment.task_locations.pop(position_tuple)
-            self.task_completed += 1
-            self.completed_tasks.append(task_number)
-            
-            # Calculate cost to reach the task and update total path cost
-            path_cost = self.total_heuristic
-            self.completed_tasks_with_costs.append((task_number, path_cost))
-            self.total_path_cost += path_cost
+    def charge_detour(self, steps):
+        self.total_heuristic += steps
 
-    def find_nearest_task(self):
-        """Find the nearest task based on the shortest path length using A*."""
-        nearest_task = None
-        shortest_path = None
-        for task_position in self.environment.task_locations.keys():
-            path, heuristic_value = self.find_path_to(task_position)
-            if path:
-                if not shortest_path or len(path) < len(shortest_path):
-                    shortest_path = path
-                    nearest_task = task_position
-                    self.total_heuristic = heuristic_value  # Update the total heuristic
-        if shortest_path:
-            self.path = shortest_path[1:]  # Exclude the current position
-            self.moving = True
+    def task_cost(self):
+        # Calculate cost to reach the task from the heuristic accumulated along the path
+        return self.total_heuristic
 
-    def find_path_to(self, target):
-        """Find a path to the target position using A* and calculate the total heuristic value."""
-        start = tuple(self.position)
-        goal = target
+    def route_leg_cost(self, path):
+        return sum(self.heuristic(a, b) for a, b in zip(path, path[1:]))
+
+    def search_nearest(self, targets, slice_size=None):
+        """
+        Generator behind find_path_to_nearest. With a slice_size it pauses after every
+        slice_size expansions, yielding the count so far; it returns (path, heuristic).
+        """
+        store = self.node_store
+        search = store.begin()
+        g_scores, parents, stamps = store.g_scores, store.parents, store.stamps
+        neighbor_cells = self.environment.neighbor_cells
+        goals = {store.cell_id(position): order for order, position in enumerate(targets)}
+        start = store.cell_id(self.position)
+        g_scores[start] = 0
+        parents[start] = -1
+        stamps[start] = search
         open_set = []
-        heapq.heappush(open_set, (0, start, [start], 0))  # Include accumulated heuristic in the tuple
-        g_scores = {start: 0}
+        heapq.heappush(open_set, (0, start))
+        best = None  # (order, cell) of the closest target reached so far
+        best_cost = None
+        nodes_expanded, heap_pushes = 0, 1
+        next_pause = slice_size or -1  # Expansion count at which to yield, never if -1
+        peak_open = 1
+        started, elapsed = time.perf_counter(), 0.0  # Compute time, leaving out the pauses between slices
 
         while open_set:
-            _, current, path, current_heuristic = heapq.heappop(open_set)
+            g_score, current = heapq.heappop(open_set)
 
-            if current == goal:
-                return path, current_heuristic
+            if best_cost is not None and g_score > best_cost:
+                break  # Every target at the shortest distance has been reached
+            if g_score > g_scores[current]:
+                continue  # Stale entry, the cell was reached more cheaply since
 
-            neighbors = self.get_neighbors(*current)
-            for neighbor in neighbors:
-                tentative_g_score = g_scores[current] + 1
+            if current in goals:
+                if best is None or goals[current] < best[0]:
+                    best = (goals[current], current)
+                    best_cost = g_score
+                continue
 
-                if neighbor not in g_scores or tentative_g_score < g_scores[neighbor]:
+            nodes_expanded += 1
+            tentative_g_score = g_score + 1
+            for neighbor in neighbor_cells(current):
+                if stamps[neighbor] != search or tentative_g_score < g_scores[neighbor]:
                     g_scores[neighbor] = tentative_g_score
-                    new_heuristic = current_heuristic + self.heuristic(current, neighbor)
-                    heapq.heappush(open_set, (tentative_g_score, neighbor, path + [neighbor], new_heuristic))
-
-        return None, 0  # No path found
+                    parents[neighbor] = current
+                    stamps[neighbor] = search
+                    heapq.heappush(open_set, (tentative_g_score, neighbor))
+                    heap_pushes += 1
+            if len(open_set) > peak_open:
+                peak_open = len(open_set)
+            if nodes_expanded == next_pause:
+                next_pause += slice_size
+                elapsed += time.perf_counter() - started
+                yield nodes_expanded
+                started = time.perf_counter()
 
-    def get_neighbors(self, x, y):
-        """Get walkable neighboring positions."""
-        neighbors = []
-        directions = [("up", (0, -1)), ("down", (0, 1)), ("left", (-1, 0)), ("right", (1, 0))]
-        for _, (dx, dy) in directions:
-            nx, ny = x + dx, y + dy
-            if self.environment.is_within_bounds(nx, ny) and not self.environment.is_barrier(nx, ny):
-                neighbors.append((nx, ny))
-        return neighbors
+        elapsed += time.perf_counter() - started
+        heap_pops = heap_pushes - len(open_set)  # Every entry pushed was either popped or is still queued
+        self.record_search(len(targets), best is not None, nodes_expanded, heap_pushes, heap_pops, peak_open, elapsed)
+        if best is None:
+            return None, self.no_path_cost  # No target reachable
+        path = reconstruct_path(store, best[1])
+        # Accumulate the heuristic step by step along the path
+        total_heuristic = sum(self.heuristic(a, b) for a, b in zip(path, path[1:]))
+        return path, total_heuristic
@@ -1,89 +1,81 @@
-import pygame
 import heapq
+import time
+from search import reconstruct_path
+from search_agent import SearchAgent
 
-class Agent2(pygame.sprite.Sprite):
+class Agent2(SearchAgent):
     def __init__(self, environment, grid_size):
-        super().__init__()
-        self.image = pygame.Surface((grid_size, grid_size))
-        self.image.fill((0, 0, 255))  # Agent color is blue
-        self.rect = self.image.get_rect()
-        self.grid_size = grid_size
-        self.environment = environment
-        self.position = [0, 0]  # Starting at the top-left corner of the grid
-        self.rect.topleft = (0, 0)
-        self.task_completed = 0
-        self.completed_tasks = []
-        self.path = []  # List of positions to follow
-        self.moving = False  # Flag to indicate if the agent is moving
-        self.total_path_cost = 0  # Store the total path cost
-        self.completed_tasks_with_costs = []  # Store completed tasks with their costs
+        super().__init__(environment, grid_size)
+        self.current_task_path = []  # Path to the task being approached
+        self.current_task_cost = 0  # Cost of that path
 
-    def move(self):
-        """Move the agent along the path."""
-        if self.path:
-            next_position = self.path.pop(0)
-            self.position = list(next_position)
-            self.rect.topleft = (self.position[0] * self.grid_size, self.position[1] * self.grid_size)
-            self.check_task_completion()
-        else:
-            self.moving = False  # Stop moving when path is exhausted
+    def reset(self):
+        """Put the agent back on the start cell with no progress, path or plan."""
+        super().reset()
+        self.current_task_cost = 0
 
-    def check_task_completion(self):
-        """Check if the agent has reached a task location."""
-        position_tuple = tuple(self.position)
-        if position_tuple in self.environment.task_locations:
-            task_number = self.environment.task_locations.pop(position_tuple)
-            self.task_completed += 1
-            self.completed_tasks.append(task_number)
-            
-            # Use the actual path cost returned by UCS
-            path_cost = self.current_task_cost
-            self.completed_tasks_with_costs.append((task_number, path_cost))
-            self.total_path_cost += path_cost  # Add this task's cost to the total path cost
+    def begin_task(self, path, cost):
+        self.current_task_path = path  # Store the path to calculate the cost
+        self.current_task_cost = cost  # Store the cost of the path
 
-    def find_nearest_task(self):
-        """Find the nearest task based on the shortest path length using UCS."""
-        nearest_task = None
-        shortest_path = None
-        shortest_cost = float('inf')
-        for task_position in self.environment.task_locations.keys():
-            path, cost = self.find_path_to(task_position)
-            if path and cost < shortest_cost:
-                shortest_path = path
-                nearest_task = task_position
-                shortest_cost = cost
-        if shortest_path:
-            self.path = shortest_path[1:]  # Exclude the current position
-            self.current_task_path = shortest_path  # Store the path to calculate the cost
-            self.current_task_cost = shortest_cost  # Store the cost of the path
-            self.moving = True
+    def charge_detour(self, steps):
+        self.current_task_cost += steps
 
-    def find_path_to(self, target):
-        """Find a path to the target position using Uniform Cost Search (UCS)."""
-        start = tuple(self.position)
-        goal = target
-        queue = [(0, start, [start])]  # (cost, current_position, path_so_far)
-        visited = set()
+    def task_cost(self):
+        # Use the actual path cost returned by UCS
+        return self.current_task_cost
+
+    def search_nearest(self, targets, slice_size=None):
+        """
+        Generator behind find_path_to_nearest. With a slice_size it pauses after every
+        slice_size expansions, yielding the count so far; it returns (path, cost).
+        """
+        store = self.node_store
+        search = store.begin()
+        g_scores, parents, stamps, visited = store.g_scores, store.parents, store.stamps, store.closed
+        neighbor_cells = self.environment.neighbor_cells
+        goals = {store.cell_id(position): order for order, position in enumerate(targets)}
+        start = store.cell_id(self.position)
+        g_scores[start] = 0
+        parents[start] = -1
+        stamps[start] = search
+        queue = [(0, start)]  # (cost, current_cell)
+        best = None  # (order, cell, cost) of the closest target reached so far
+        nodes_expanded, heap_pushes = 0, 1
+        next_pause = slice_size or -1  # Expansion count at which to yield, never if -1
+        peak_open = 1
+        started, elapsed = time.perf_counter(), 0.0  # Compute time, leaving out the pauses between slices
 
         while queue:
-            cost, current, path = heapq.heappop(queue)
-            if current not in visited:
-                visited.add(current)
-                if current == goal:
-                    return path, cost  # Return the path and its cost
-                neighbors = self.get_neighbors(*current)
-                for neighbor in neighbors:
+            cost, current = heapq.heappop(queue)
+            if best is not None and cost > best[2]:
+                break  # Every target at the lowest cost has been reached
+            if visited[current] != search:
+                visited[current] = search
+                if current in goals:
+                    if best is None or goals[current] < best[0]:
+                        best = (goals[current], current, cost)
+                    continue
+                nodes_expanded += 1
+                for neighbor in neighbor_cells(current):
                     # Assume uniform cost of 1 for each step
-                    heapq.heappush(queue, (cost + 1, neighbor, path + [neighbor]))
-        return None, float('inf')  # No path found
-
+                    if visited[neighbor] != search and (stamps[neighbor] != search or cost + 1 < g_scores[neighbor]):
+                        g_scores[neighbor] = cost + 1
+                        parents[neighbor] = current
+                        stamps[neighbor] = search
+                        heapq.heappush(queue, (cost + 1, neighbor))
+                        heap_pushes += 1
+                if len(queue) > peak_open:
+                    peak_open = len(queue)
+                if nodes_expanded == next_pause:
+                    next_pause += slice_size
+                    elapsed += time.perf_counter() - started
+                    yield nodes_expanded
+                    started = time.perf_counter()
 
-    def get_neighbors(self, x, y):
-        """Get walkable neighboring positions."""
-        neighbors = []
-        directions = [("up", (0, -1)), ("down", (0, 1)), ("left", (-1, 0)), ("right", (1, 0))]
-        for _, (dx, dy) in directions:
-            nx, ny = x + dx, y + dy
-            if self.environment.is_within_bounds(nx, ny) and not self.environment.is_barrier(nx, ny):
-                neighbors.append((nx, ny))
-        return neighbors
+        elapsed += time.perf_counter() - started
+        heap_pops = heap_pushes - len(queue)  # Every entry pushed was either popped or is still queued
+        self.record_search(len(targets), best is not None, nodes_expanded, heap_pushes, heap_pops, peak_open, elapsed)
+        if best is None:
+            return None, self.no_path_cost  # No target reachable
+        return reconstruct_path(store, best[1]), best[2]
@@ -0,0 +1,234 @@
+import heapq
+import time
+import weakref
+import numpy as np
+from agent2 import Agent2
+from search import reconstruct_path
+
+_jump_tables = weakref.WeakKeyDictionary()  # One set of tables per environment
+
+
+def _scan(walkable, marked, axis, step):
+    """
+    For every cell, look along `axis` in direction `step` and return two arrays:
+    the distance to the first marked cell before a barrier or the edge (0 if none),
+    and the number of walkable cells before a barrier or the edge.
+    """
+    if step < 0:
+        walkable, marked = np.flip(walkable, axis), np.flip(marked, axis)
+    size = walkable.shape[axis]
+    index = np.arange(size).reshape((-1, 1) if axis == 0 else (1, -1))
+
+    def next_index(cells):
+        # Index of the first cell strictly ahead that is set in `cells`, or `size` if none
+        ahead = np.where(cells, index, size)
+        ahead = np.flip(np.minimum.accumulate(np.flip(ahead, axis), axis=axis), axis)
+        shifted = np.full_like(ahead, size)
+        if axis == 0:
+            shifted[:-1] = ahead[1:]
+        else:
+            shifted[:, :-1] = ahead[:, 1:]
+        return shifted
+
+    next_wall = next_index(~walkable)
+    next_mark = next_index(marked & walkable)
+    reach = (next_wall - index - 1).astype(np.int32)
+    forced = np.where(next_mark < next_wall, next_mark - index, 0).astype(np.int32)
+    if step < 0:
+        reach, forced = np.flip(reach, axis), np.flip(forced, axis)
+    return np.ascontiguousarray(forced), np.ascontiguousarray(reach)
+
+
+class JumpTables:
+    """
+    Precomputed jump distances for every cell and direction of an environment (JPS+).
+    A jump then costs one table lookup instead of stepping cell by cell. Only the
+    goal checks depend on the query, and those are done per jump from the goal list.
+    The tables are rebuilt on the next search after any barrier change.
+    """
+
+    def __init__(self, environment):
+        # Weak, as _jump_tables is keyed on the environment and a strong reference would keep it alive
+        self.environment_ref = weakref.ref(environment)
+        self.stale = True
+        environment.barrier_listeners.add(self)
+
+    @property
+    def environment(self):
+        return self.environment_ref()
+
+    @classmethod
+    def for_environment(cls, environment):
+        """Return the tables cached for this environment, creating them on first use."""
+        tables = _jump_tables.get(environment)
+        if tables is None:
+            tables = _jump_tables[environment] = cls(environment)
+        return tables
+
+    def barriers_changed(self, cells):
+        self.stale = True
+
+    def refresh(self):
+        """Rebuild the tables if barriers changed since they were computed."""
+        if not self.stale:
+            return
+        walkable = self.environment.grid == 0
+        padded = np.zeros((walkable.shape[0] + 2, walkable.shape[1] + 2), dtype=bool)
+        padded[1:-1, 1:-1] = walkable
+
+        def shifted(dx, dy):
+            # walkable[x + dx, y + dy] for every cell, False outside the grid
+            return padded[1 + dx:padded.shape[0] - 1 + dx, 1 + dy:padded.shape[1] - 1 + dy]
+
+        self.forced, self.reach = {}, {}
+        for dx in (1, -1):
+            # Moving horizontally, a cell is forced if it opens up or down where the previous cell did not
+            marked = (shifted(0, -1) & ~shifted(-dx, -1)) | (shifted(0, 1) & ~shifted(-dx, 1))
+            self.forced[dx, 0], self.reach[dx, 0] = _scan(walkable, marked, 0, dx)
+        # A vertical jump also stops wherever a horizontal jump would find a forced cell
+        horizontal = (self.forced[1, 0] > 0) | (self.forced[-1, 0] > 0)
+        for dy in (1, -1):
+            marked = (shifted(-1, 0) & ~shifted(-1, -dy)) | (shifted(1, 0) & ~shifted(1, -dy)) | horizontal
+            self.forced[0, dy], self.reach[0, dy] = _scan(walkable, marked, 1, dy)
+
+        # Flat views indexed by cell id for the search loop
+        self.forced = {direction: memoryview(table.reshape(-1)) for direction, table in self.forced.items()}
+        self.reach = {direction: memoryview(table.reshape(-1)) for direction, table in self.reach.items()}
+        self.stale = False
+
+
+class Agent3(Agent2):
+    """
+    Agent that finds its paths with Jump Point Search on the 4-connected grid.
+    Every step costs 1, so runs of open cells are symmetric; JPS skips straight
+    over them and only pushes cells where the path may have to turn. Paths have
+    the same cost as UCS, while nodes_expanded counts jump points only.
+    """
+
+    def jump(self, tables, x, y, dx, dy, goals):
+        """
+        Jump from (x, y) in direction (dx, dy) and return the cell id of the first goal or
+        forced cell on the way, or None if the jump runs into a barrier or the edge first.
+        `goals` holds (gx, gy, left, right) for each goal: the open run of its row it can be seen from.
+        """
+        rows = self.environment.rows
+        cell = x * rows + y
+        forced = tables.forced[dx, dy][cell]
+        reach = tables.reach[dx, dy][cell]
+        distance = forced or None
+        limit = forced or reach
+        for gx, gy, left, right in goals:
+            if dx:
+                ahead = (gx - x) * dx
+                if gy == y and 0 < ahead <= limit and (distance is None or ahead < distance):
+                    distance = ahead
+            else:
+                # A vertical jump stops on any row where a horizontal jump would see the goal
+                ahead = (gy - y) * dy
+                if left <= x <= right and 0 < ahead <= limit and (distance is None or ahead < distance):
+                    distance = ahead
+        if distance is None:
+            return None
+        return (x + dx * distance) * rows + y + dy * distance
+
+    def find_path_to(self, target):
+        """
+        Find a path to the target position with Jump Point Search. There is no bidirectional
+        JPS, so the bidirectional switch inherited from Agent2 is ignored rather than
+        answering with bidirectional UCS.
+        """
+        return self.find_path_to_nearest([target])
+
+    def search_nearest(self, targets, slice_size=None):
+        """
+        Jump Point Search outward once from the agent, returning the path to the closest target.
+        Targets at the same cost are resolved in the iteration order of `targets`, like Agent2,
+        and a slice_size pauses the search after that many jump point expansions.
+        """
+        tables = JumpTables.for_environment(self.environment)
+        tables.refresh()
+        store = self.node_store
+        search = store.begin()
+        g_scores, parents, stamps, visited = store.g_scores, store.parents, store.stamps, store.closed
+        rows = store.rows
+        goals = {}
+        goal_runs = []
+        left_reach, right_reach = tables.reach[-1, 0], tables.reach[1, 0]
+        for order, position in enumerate(targets):
+            if self.environment.is_within_bounds(*position) and not self.environment.is_barrier(*position):
+                cell = store.cell_id(position)
+                goals.setdefault(cell, order)
+                gx, gy = position
+                goal_runs.append((gx, gy, gx - left_reach[cell], gx + right_reach[cell]))
+        start = store.cell_id(self.position)
+        g_scores[start] = 0
+        parents[start] = -1
+        stamps[start] = search
+        queue = [(0, start)]  # (cost, jump point)
+        best = None  # (order, cell, cost) of the closest target reached so far
+        nodes_expanded, heap_pushes = 0, 1
+        next_pause = slice_size or -1  # Expansion count at which to yield, never if -1
+        peak_open = 1
+        started, elapsed = time.perf_counter(), 0.0  # Compute time, leaving out the pauses between slices
+
+        while queue:
+            cost, current = heapq.heappop(queue)
+            if best is not None and cost > best[2]:
+                break  # Every target at the lowest cost has been reached
+            if visited[current] == search:
+                continue
+            visited[current] = search
+            if current in goals:
+                if best is None or goals[current] < best[0]:
+                    best = (goals[current], current, cost)
+                continue
+            nodes_expanded += 1
+
+            x, y = divmod(current, rows)
+            parent = parents[current]
+            if parent == -1:
+                directions = ((0, -1), (0, 1), (-1, 0), (1, 0))
+            else:
+                px, py = divmod(parent, rows)
+                dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+                # Only the turns and the straight continuation can lie on a shorter path
+                directions = ((0, -1), (0, 1), (dx, 0)) if dx else ((-1, 0), (1, 0), (0, dy))
+
+            for dx, dy in directions:
+                jump_point = self.jump(tables, x, y, dx, dy, goal_runs)
+                if jump_point is None or visited[jump_point] == search:
+                    continue
+                jx, jy = divmod(jump_point, rows)
+                new_cost = cost + abs(jx - x) + abs(jy - y)
+                if stamps[jump_point] != search or new_cost < g_scores[jump_point]:
+                    g_scores[jump_point] = new_cost
+                    parents[jump_point] = current
+                    stamps[jump_point] = search
+                    heapq.heappush(queue, (new_cost, jump_point))
+                    heap_pushes += 1
+            if len(queue) > peak_open:
+                peak_open = len(queue)
+            if nodes_expanded == next_pause:
+                next_pause += slice_size
+                elapsed += time.perf_counter() - started
+                yield nodes_expanded
+                started = time.perf_counter()
+
+        elapsed += time.perf_counter() - started
+        heap_pops = heap_pushes - len(queue)  # Every entry pushed was either popped or is still queued
+        self.record_search(len(targets), best is not None, nodes_expanded, heap_pushes, heap_pops, peak_open, elapsed)
+        if best is None:
+            return None, float('inf')  # No target reachable
+        return self.expand_path(reconstruct_path(store, best[1])), best[2]
+
+    @staticmethod
+    def expand_path(jump_points):
+        """Fill in the straight runs between consecutive jump points."""
+        path = jump_points[:1]
+        for (x2, y2) in jump_points[1:]:
+            x, y = path[-1]
+            dx, dy = (x2 > x) - (x2 < x), (y2 > y) - (y2 < y)
+            while (x, y) != (x2, y2):
+                x, y = x + dx, y + dy
+                path.append((x, y))
+        return path
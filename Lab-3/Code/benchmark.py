@@ -0,0 +1,330 @@
+# benchmark.py
+"""
+Headless batch runner that compares the Lab-3 agents across many seeded environments.
+
+Example:
+    python benchmark.py --runs 20 --sizes 50x50 200x200 --tasks 10 50 --barriers 100 2000 --output results.csv
+    python benchmark.py --scenarios maps/*.scn --output results.csv
+    python benchmark.py --runs 5 --sizes 100x100 --profile searches.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # The agents build pygame surfaces, but nothing is displayed
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from agent1 import Agent1
+from agent2 import Agent2
+from agent3 import Agent3
+from environment import Environment, parse_size
+from hierarchy import HierarchicalPlanner
+from incremental import IncrementalPlanner
+from profiler import SearchProfiler
+from scenario import load_environment, read_header
+from search import SearchStats
+
+ALGORITHMS = {"A*": Agent1, "UCS": Agent2, "JPS": Agent3}
+FIELDS = [
+    "algorithm", "plan_route", "bidirectional", "scenario", "seed", "columns", "rows", "num_tasks", "num_barriers",
+    "unreachable_tasks", "tasks_completed", "stalled", "total_path_cost", "searches",
+    "nodes_expanded", "heap_pushes", "wall_time", "cache_hits", "cache_misses",
+    "replans", "replan_full_nodes", "replan_incremental_nodes", "replan_full_time", "replan_incremental_time",
+    "hpa_queries", "hpa_build_time", "hpa_flat_time", "hpa_time", "hpa_flat_cost", "hpa_cost",
+]
+
+
+def run_to_completion(agent):
+    """
+    Drive an agent without rendering until every task is done or it can make no progress.
+    Returns True if the agent stalled with tasks left (unreachable, or a task under its start).
+    """
+    environment = agent.environment
+    while environment.task_locations:
+        agent.find_nearest_task()
+        if not agent.moving or not agent.path:
+            agent.moving = False
+            return True
+        while agent.moving:
+            agent.move()
+    return False
+
+
+@contextlib.contextmanager
+def unrecorded(agent):
+    """Keep the searches of a measurement out of the agent's search stats and the path cache counters."""
+    cache = agent.environment.path_cache
+    saved = agent.search_stats, cache.hits, cache.misses
+    agent.search_stats = SearchStats()
+    try:
+        yield
+    finally:
+        agent.search_stats, cache.hits, cache.misses = saved
+
+
+def measure_replanning(agent, count, rng):
+    """
+    Block one cell on the current path `count` times and replan after each change,
+    once with a full find_path_to and once with the incremental planner. The
+    blocked cells are cleared again afterwards so the environment is unchanged.
+    """
+    environment = agent.environment
+    start = tuple(agent.position)
+    metrics = dict(replans=0, replan_full_nodes=0, replan_incremental_nodes=0,
+                   replan_full_time=0.0, replan_incremental_time=0.0)
+    if not count:
+        return metrics
+    with unrecorded(agent):
+        path_lengths = {}
+        for task in environment.task_locations:
+            path, _ = agent.find_path_to(task)
+            if path:
+                path_lengths[task] = len(path)
+        if not path_lengths:
+            return metrics
+        goal = max(path_lengths, key=path_lengths.get)  # The farthest task gives the longest path to disturb
+        planner = IncrementalPlanner(environment, goal)
+        path, _ = planner.plan(start)
+        blocked = []
+        for _ in range(count):
+            if path is None or len(path) < 3:
+                break
+            cell = rng.choice(path[1:-1])
+            environment.barrier_locations.add(cell)
+            blocked.append(cell)
+
+            expanded_before = agent.search_stats.nodes_expanded
+            start_time = time.perf_counter()
+            full_path, _ = agent.find_path_to(goal)
+            metrics["replan_full_time"] += time.perf_counter() - start_time
+            metrics["replan_full_nodes"] += agent.search_stats.nodes_expanded - expanded_before
+
+            start_time = time.perf_counter()
+            path, _ = planner.plan(start)
+            metrics["replan_incremental_time"] += time.perf_counter() - start_time
+            metrics["replan_incremental_nodes"] += planner.nodes_expanded
+            metrics["replans"] += 1
+            assert (path is None) == (full_path is None) and (path is None or len(path) == len(full_path))
+
+        planner.close()
+        environment.barrier_locations.difference_update(blocked)
+    return metrics
+
+
+def measure_hierarchical(agent, count, rng, cluster_size=16):
+    """
+    Answer `count` random point-to-point queries with the agent's flat search and with
+    HPA*, and report the one-off build time, query times and total path costs of both.
+    """
+    environment = agent.environment
+    metrics = dict(hpa_queries=0, hpa_build_time=0.0, hpa_flat_time=0.0, hpa_time=0.0, hpa_flat_cost=0, hpa_cost=0)
+    if not count:
+        return metrics
+    with unrecorded(agent):
+        planner = HierarchicalPlanner(environment, cluster_size)
+        start_time = time.perf_counter()
+        planner.rebuild()
+        metrics["hpa_build_time"] = time.perf_counter() - start_time
+        position = agent.position
+        free = [(x, y) for x in range(environment.columns) for y in range(environment.rows) if not environment.is_barrier(x, y)]
+        for _ in range(count):
+            start, goal = rng.choice(free), rng.choice(free)
+            agent.position = list(start)
+            start_time = time.perf_counter()
+            flat_path, _ = agent.find_path_to(goal)
+            metrics["hpa_flat_time"] += time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            path, cost = planner.find_path(start, goal)
+            metrics["hpa_time"] += time.perf_counter() - start_time
+            if flat_path and path:
+                metrics["hpa_queries"] += 1
+                metrics["hpa_flat_cost"] += len(flat_path) - 1
+                metrics["hpa_cost"] += cost
+        planner.close()
+        agent.position = position
+    return metrics
+
+
+_world = {}  # The last generated environment in this worker process, keyed by seed and configuration
+
+
+def seeded_world(trial):
+    """
+    Return a fork of the trial's seeded environment. Trials of every algorithm on the
+    same seed run back to back in one worker, so the map is generated once and each
+    trial gets a copy-on-write fork of it.
+    """
+    key = tuple(trial[field] for field in ("scenario", "seed", "columns", "rows", "num_tasks", "num_barriers"))
+    if key not in _world:
+        random.seed(trial["seed"])
+        _world.clear()
+        if trial["scenario"]:
+            _world[key] = load_environment(trial["scenario"])
+        else:
+            _world[key] = Environment(trial["columns"], trial["rows"], 1, trial["num_tasks"], trial["num_barriers"])
+    return _world[key].fork()
+
+
+def run_trial(trial):
+    """Fork the seeded environment for one trial, run one algorithm on it and return its metrics."""
+    environment = seeded_world(trial)
+    cache_hits, cache_misses = environment.path_cache.hits, environment.path_cache.misses  # Shared with earlier forks
+    agent = ALGORITHMS[trial["algorithm"]](environment, 1)
+    agent.bidirectional = trial["bidirectional"] and not isinstance(agent, Agent3)  # JPS has no bidirectional variant
+    replanning = measure_replanning(agent, trial["replans"], random.Random(trial["seed"]))
+    hierarchical = measure_hierarchical(agent, trial["hpa_queries"], random.Random(trial["seed"]))
+
+    if trial["profile"]:
+        agent.profiler = SearchProfiler()  # Attached after the measurements, so it records the run only
+    start_time = time.perf_counter()
+    if trial["plan_route"]:
+        agent.plan_route()
+    stalled = run_to_completion(agent)
+    wall_time = time.perf_counter() - start_time
+
+    return dict(
+        trial,
+        bidirectional=agent.bidirectional,
+        unreachable_tasks=len(environment.unreachable_tasks),
+        tasks_completed=agent.task_completed,
+        stalled=stalled,
+        total_path_cost=agent.total_path_cost,
+        searches=agent.search_stats.searches,
+        nodes_expanded=agent.search_stats.nodes_expanded,
+        heap_pushes=agent.search_stats.heap_pushes,
+        wall_time=wall_time,
+        cache_hits=environment.path_cache.hits - cache_hits,
+        cache_misses=environment.path_cache.misses - cache_misses,
+        **replanning,
+        **hierarchical,
+        profile=list(agent.profiler.records) if agent.profiler else None,
+    )
+
+
+def generate_trials(args):
+    """
+    Every combination of grid size, task count and barrier count, for every seed and algorithm,
+    or every algorithm on each saved scenario if any are given.
+    """
+    common = {
+        "plan_route": args.plan_route, "replans": args.replans, "hpa_queries": args.hpa_queries,
+        "profile": bool(args.profile), "bidirectional": args.bidirectional,
+    }
+    for path in args.scenarios:
+        header, _ = read_header(path)
+        shapes = {entry["name"]: entry["shape"] for entry in header["arrays"]}
+        (columns, rows), num_tasks = shapes["grid"], shapes["tasks"][0]
+        for algorithm in args.algorithms:
+            yield dict(common, algorithm=algorithm, scenario=path, seed=args.seed, columns=columns, rows=rows,
+                       num_tasks=num_tasks, num_barriers=header["meta"]["num_barriers"])
+    if args.scenarios:
+        return
+    for (columns, rows), num_tasks, num_barriers in itertools.product(args.sizes, args.tasks, args.barriers):
+        if num_tasks + num_barriers >= columns * rows:
+            continue  # Not enough cells to place everything besides the start
+        for run in range(args.runs):
+            for algorithm in args.algorithms:
+                yield {
+                    **common,
+                    "algorithm": algorithm,
+                    "scenario": None,
+                    "seed": args.seed + run,
+                    "columns": columns,
+                    "rows": rows,
+                    "num_tasks": num_tasks,
+                    "num_barriers": num_barriers,
+                }
+
+
+def write_results(results, output):
+    """Write results as JSON if the output path ends in .json, otherwise as CSV."""
+    if output and output.endswith(".json"):
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        return
+    f = open(output, "w", newline="") if output else sys.stdout
+    try:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+    finally:
+        if output:
+            f.close()
+
+
+def print_summary(results):
+    """Print per-algorithm totals to stderr so they don't mix with CSV on stdout."""
+    for algorithm in sorted({result["algorithm"] for result in results}):
+        rows = [result for result in results if result["algorithm"] == algorithm]
+
+        def total(field):
+            return sum(row[field] for row in rows)
+
+        lines = [
+            f"{len(rows)} runs, path cost {total('total_path_cost')}, "
+            f"nodes expanded {total('nodes_expanded')}, heap pushes {total('heap_pushes')}, "
+            f"wall time {total('wall_time'):.2f}s, stalled {total('stalled')}"
+        ]
+        if total("replans"):
+            lines.append(
+                f"{total('replans')} replans, "
+                f"full search {total('replan_full_nodes')} nodes / {total('replan_full_time'):.3f}s, "
+                f"incremental {total('replan_incremental_nodes')} nodes / {total('replan_incremental_time'):.3f}s"
+            )
+        if total("hpa_queries"):
+            lines.append(
+                f"{total('hpa_queries')} HPA* queries, build {total('hpa_build_time'):.2f}s, "
+                f"flat {total('hpa_flat_time'):.3f}s / cost {total('hpa_flat_cost')}, "
+                f"HPA* {total('hpa_time'):.3f}s / cost {total('hpa_cost')}"
+            )
+        for line in lines:
+            print(f"{algorithm}: {line}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the A*, UCS and JPS agents headless over many seeded environments.")
+    parser.add_argument("--runs", type=int, default=10, help="seeded environments per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--scenarios", nargs="+", default=[],
+                        help="scenario files (see scenario.py) to run instead of generated maps")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(22, 17)], help="grid sizes as COLUMNSxROWS")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10], help="task counts")
+    parser.add_argument("--barriers", type=int, nargs="+", default=[15], help="barrier counts")
+    parser.add_argument("--algorithms", nargs="+", choices=sorted(ALGORITHMS), default=sorted(ALGORITHMS))
+    parser.add_argument("--plan-route", action="store_true", help="plan a task tour before moving")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="answer point-to-point queries (route legs, replans, flat HPA* baselines) from both ends; "
+                             "JPS runs are unaffected")
+    parser.add_argument("--replans", type=int, default=0,
+                        help="single-cell barrier changes to replan after, full search vs incremental")
+    parser.add_argument("--hpa-queries", type=int, default=0,
+                        help="random point-to-point queries to answer with flat search and with HPA*")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--output", help="CSV or .json file to write (default: CSV on stdout)")
+    parser.add_argument("--profile", help="CSV or .json file for a record of every search and nearest-task query")
+    args = parser.parse_args(argv)
+
+    trials = list(generate_trials(args))
+    # Whole seeds per chunk, so each worker generates a map once for all the algorithms
+    chunksize = max(1, len(trials) // 64 // len(args.algorithms)) * len(args.algorithms)
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(run_trial, trials, chunksize=chunksize))
+
+    profiler = SearchProfiler()
+    for result in results:
+        profiler.merge(result.pop("profile") or [])
+    if args.profile:
+        profiler.write(args.profile)
+    write_results(results, args.output)
+    print_summary(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,146 @@
 # environment.py
+import copy
+import itertools
 import random
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+# Barrier versions are unique across all environments, so forks sharing a path cache
+# never mistake one layout for another
+_barrier_versions = itertools.count(1)
+
+
+def parse_size(text):
+    """Parse a COLUMNSxROWS grid size."""
+    columns, _, rows = text.lower().partition("x")
+    return int(columns), int(rows or columns)
+
+
+class BarrierSet(set):
+    """Set of barrier positions that keeps the environment's occupancy grid in sync."""
+
+    def __init__(self, environment, locations=()):
+        super().__init__(locations)
+        self.environment = environment
+
+    def __reduce__(self):
+        # Copies and pickles are plain sets, detached from the environment
+        return (set, (list(self),))
+
+    def detach(self):
+        """Stop writing to the environment's grid, once the environment has replaced this set."""
+        self.environment = None
+
+    def fill_cells(self, locations, value):
+        if self.environment is not None:
+            self.environment.fill_cells(locations, value)
+
+    def add(self, location):
+        if location not in self:
+            super().add(location)
+            self.fill_cells([location], 1)
+
+    def remove(self, location):
+        super().remove(location)
+        self.fill_cells([location], 0)
+
+    def discard(self, location):
+        if location in self:
+            self.remove(location)
+
+    def pop(self):
+        location = super().pop()
+        self.fill_cells([location], 0)
+        return location
+
+    def clear(self):
+        removed = list(self)
+        super().clear()
+        self.fill_cells(removed, 0)
+
+    def update(self, *others):
+        for other in others:
+            added = [location for location in other if location not in self]
+            super().update(added)
+            self.fill_cells(added, 1)
+
+    def difference_update(self, *others):
+        for other in others:
+            removed = [location for location in other if location in self]
+            super().difference_update(removed)
+            self.fill_cells(removed, 0)
+
+    def intersection_update(self, *others):
+        self.difference_update(set(self).difference(*others))
+
+    def symmetric_difference_update(self, other):
+        other = set(other)
+        self.difference_update(other & self)
+        self.update(other - self)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+
+class PathCache:
+    """
+    Bounded LRU cache of search results for one environment.
+    Callers put the environment's barrier_version into every key, so a result
+    found before a barrier change is never returned after it; it just ages out.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store a value, dropping the least recently used entry if the cache is full."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+
+class EnvironmentSnapshot:
+    """Frozen tasks and occupancy grid of an environment, as taken by Environment.snapshot()."""
+
+    __slots__ = ("task_locations", "grid", "barrier_version")
+
+    def __init__(self, task_locations, grid, barrier_version):
+        self.task_locations = task_locations  # Tuple of (location, task number) pairs
+        self.grid = grid  # Read-only, shared with the environment until it next writes a barrier
+        self.barrier_version = barrier_version
+
 
 class Environment:
     def __init__(self, width, height, grid_size, num_tasks, num_barriers):
@@ -8,28 +149,218 @@ class Environment:
         self.grid_size = grid_size
         self.columns = width // grid_size
         self.rows = height // grid_size
-        self.task_locations = self.generate_tasks(num_tasks)
-        self.barrier_locations = self.generate_random_locations(num_barriers, exclude=set(self.task_locations.keys()))
+        self.init_grid(np.zeros((self.columns, self.rows), dtype=np.uint8))
+        self.generate_map(num_tasks, num_barriers)
+
+    @classmethod
+    def from_arrays(cls, grid, task_locations, grid_size=1, unreachable_tasks=()):
+        """
+        Build an environment around an existing occupancy grid instead of a random map.
+        A read-only grid (such as a memory-mapped scenario) is used as is and only
+        copied once a barrier changes. task_locations maps (x, y) to task numbers.
+        """
+        environment = cls.__new__(cls)
+        environment.grid_size = grid_size
+        environment.columns, environment.rows = grid.shape
+        environment.width = environment.columns * grid_size
+        environment.height = environment.rows * grid_size
+        environment.init_grid(grid)
+        environment.task_locations = dict(task_locations)
+        environment.unreachable_tasks = list(unreachable_tasks)
+        return environment
+
+    def init_grid(self, grid):
+        """Adopt an occupancy grid and reset the state derived from it."""
+        # Occupancy grid indexed [x, y], 1 marks a barrier. Cell ids are x * rows + y,
+        # so `cells` is the same grid flattened for the search loops.
+        self.grid = grid
+        self.cells = memoryview(self.grid.reshape(-1))
+        self.barrier_listeners = weakref.WeakSet()  # Objects told about barrier changes via barriers_changed(cells)
+        self.barrier_version = next(_barrier_versions)  # Changes to a new, never reused number whenever a barrier is added or removed
+        self.path_cache = PathCache()  # Search results keyed by start, goal(s) and barrier_version
+        self.rng = np.random.default_rng(random.getrandbits(64))  # Seeded from `random`, so random.seed still applies
+        self._labels = None  # Cached component_labels() and the barrier_version they were computed for
+        self._labels_version = None
+        self.unreachable_tasks = []  # Tasks no path from the start cell (0, 0) can reach
+        self._barrier_locations = None  # Built from the grid on first use
+        self.task_locations = {}
+
+    @property
+    def barrier_locations(self):
+        """Barrier positions as a set; mutating it updates the occupancy grid."""
+        if self._barrier_locations is None:
+            # Built from the grid on first use, since large maps may never need it
+            xs, ys = np.nonzero(self.grid)
+            self._barrier_locations = BarrierSet(self, zip(xs.tolist(), ys.tolist()))
+        return self._barrier_locations
+
+    @barrier_locations.setter
+    def barrier_locations(self, locations):
+        old, new = self.barrier_locations, BarrierSet(self, locations)
+        self._barrier_locations = new
+        old.detach()
+        # Only cells that actually change are written, so restoring the same barriers keeps the version
+        self.fill_cells(old - new, 0)
+        self.fill_cells(new - old, 1)
+
+    def fill_cells(self, locations, value):
+        """Write value into the occupancy grid at every (x, y) in locations, bumping the version if any changed."""
+        if locations:
+            xs, ys = np.array(list(locations), dtype=np.intp).reshape(-1, 2).T
+            inside = (0 <= xs) & (xs < self.columns) & (0 <= ys) & (ys < self.rows)
+            xs, ys = xs[inside], ys[inside]
+            changed = self.grid[xs, ys] != value
+            xs, ys = xs[changed], ys[changed]
+            if not len(xs):
+                return
+            self.own_grid()
+            self.grid[xs, ys] = value
+            self.barrier_version = next(_barrier_versions)
+            self.notify_barrier_listeners(xs * self.rows + ys)
+
+    def notify_barrier_listeners(self, cells):
+        """Tell every barrier listener which cell ids changed."""
+        if self.barrier_listeners:
+            cells = cells.tolist()
+            for listener in list(self.barrier_listeners):
+                listener.barriers_changed(cells)
+
+    def own_grid(self):
+        """Copy the occupancy grid before writing if a snapshot or fork still shares it."""
+        if not self.grid.flags.writeable:
+            self.grid = np.array(self.grid)  # A plain array even when the shared grid is memory-mapped
+            self.cells = memoryview(self.grid.reshape(-1))
+
+    def snapshot(self):
+        """
+        Capture the tasks and barriers without copying the grid: it is frozen and
+        shared, and whichever side writes a barrier next copies it first.
+        """
+        self.grid.flags.writeable = False
+        return EnvironmentSnapshot(tuple(self.task_locations.items()), self.grid, self.barrier_version)
+
+    def restore(self, snapshot):
+        """Return the tasks and barriers to a snapshot, telling listeners only about cells that differ."""
+        self.task_locations = dict(snapshot.task_locations)
+        if snapshot.barrier_version == self.barrier_version:
+            return
+        changed = np.flatnonzero(self.grid != snapshot.grid)
+        self.grid = snapshot.grid
+        self.cells = memoryview(self.grid.reshape(-1))
+        self.barrier_version = snapshot.barrier_version  # Same layout, so cached paths and labels apply again
+        if self._barrier_locations is not None:
+            xs, ys = np.divmod(changed, self.rows)
+            for location, barrier in zip(zip(xs.tolist(), ys.tolist()), self.grid.reshape(-1)[changed].tolist()):
+                # Plain set methods, as the grid already holds the restored barriers
+                if barrier:
+                    set.add(self._barrier_locations, location)
+                else:
+                    set.discard(self._barrier_locations, location)
+        self.notify_barrier_listeners(changed)
+
+    def fork(self):
+        """
+        Return an independent copy that shares the grid copy-on-write, along with
+        the path cache and region labels, which are keyed by barrier_version.
+        """
+        self.grid.flags.writeable = False
+        twin = copy.copy(self)
+        twin.barrier_listeners = weakref.WeakSet()
+        twin.task_locations = dict(self.task_locations)
+        twin.unreachable_tasks = list(self.unreachable_tasks)
+        twin._barrier_locations = None
+        twin.rng = np.random.default_rng(self.rng.integers(2 ** 63))
+        return twin
+
+    def sample_cells(self, count, exclude=()):
+        """Pick count distinct cell ids uniformly at random, none of them among the exclude cell ids."""
+        size = self.columns * self.rows
+        exclude = np.unique(np.asarray(list(exclude), dtype=np.intp))
+        if count > size - len(exclude):
+            raise ValueError(f"cannot place {count} items on {size - len(exclude)} free cells")
+        picks = self.rng.choice(size - len(exclude), size=count, replace=False)
+        # picks index the free cells only; skip over every excluded id at or below each one
+        return picks + np.searchsorted(exclude - np.arange(len(exclude)), picks, side="right")
+
+    def generate_map(self, num_tasks, num_barriers, reachable=True):
+        """
+        Place tasks and barriers on distinct random cells, never on the start cell (0, 0).
+        With reachable=True, tasks walled off from the start are moved to random free
+        cells the start can reach. Tasks that still cannot be reached (the start's region
+        is too small, or reachable=False) are listed in unreachable_tasks.
+        """
+        rows = self.rows
+        cells = self.sample_cells(num_tasks + num_barriers, exclude=[0])
+        task_cells, barrier_cells = cells[:num_tasks], cells[num_tasks:]
+        self.own_grid()
+        self.grid[:] = 0
+        self.grid.reshape(-1)[barrier_cells] = 1
+        if self._barrier_locations is not None:
+            self._barrier_locations.detach()
+        self._barrier_locations = None  # The grid holds the barriers until the set is needed
+        self.barrier_version = next(_barrier_versions)
+
+        labels = self.component_labels()
+        stranded = np.flatnonzero(labels[task_cells] != labels[0])
+        if reachable and len(stranded):
+            free = np.flatnonzero(labels == labels[0])
+            free = np.setdiff1d(free, np.append(task_cells, 0), assume_unique=True)
+            moved = self.rng.choice(free, size=min(len(stranded), len(free)), replace=False)
+            task_cells[stranded[:len(moved)]] = moved
+            stranded = stranded[len(moved):]
+
+        xs, ys = np.divmod(task_cells, rows)
+        self.task_locations = {location: number for number, location in enumerate(zip(xs.tolist(), ys.tolist()), 1)}
+        self.unreachable_tasks = [divmod(int(task_cells[index]), rows) for index in stranded]
 
     def generate_tasks(self, count):
         """Generate task locations with unique task numbers."""
-        tasks = {}
-        for task_number in range(1, count + 1):
-            while True:
-                location = (random.randint(0, self.columns - 1), random.randint(0, self.rows - 1))
-                if location not in tasks:
-                    tasks[location] = task_number
-                    break
-        return tasks
+        xs, ys = np.divmod(self.sample_cells(count), self.rows)
+        return {location: number for number, location in enumerate(zip(xs.tolist(), ys.tolist()), 1)}
 
     def generate_random_locations(self, count, exclude=set()):
         """Generate unique random locations that are not in the exclude set."""
-        locations = set()
-        while len(locations) < count:
-            location = (random.randint(0, self.columns - 1), random.randint(0, self.rows - 1))
-            if location not in exclude:
-                locations.add(location)
-        return locations
+        exclude = [self.cell_id(location) for location in exclude]
+        xs, ys = np.divmod(self.sample_cells(count, exclude), self.rows)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    def component_labels(self):
+        """
+        Label the connected open regions of the grid, as an array indexed by cell id.
+        Two open cells share a label exactly when a path joins them; barriers are -1.
+        Each vertical run of open cells is one node, and a vectorized union-find joins
+        runs that touch sideways: every edge hooks the larger of its two roots onto the
+        smaller, then pointer jumping flattens the trees, until no edge joins two roots.
+        The labels are cached until the barriers change.
+        """
+        if self._labels_version == self.barrier_version:
+            return self._labels
+        open_cells = self.grid == 0
+        starts = open_cells.copy()
+        starts[:, 1:] &= ~open_cells[:, :-1]  # Open cells with a barrier or the edge above them
+        runs = np.cumsum(starts.reshape(-1)) - 1  # Run of every open cell, in cell id order
+        run_grid = runs.reshape(open_cells.shape)
+        across = open_cells[:-1, :] & open_cells[1:, :]  # (x, y) and (x + 1, y) both open
+        first, second = run_grid[:-1, :][across], run_grid[1:, :][across]
+
+        parent = np.arange(runs[-1] + 1 if len(runs) else 0)
+        while True:
+            root_first, root_second = parent[first], parent[second]
+            joining = root_first != root_second
+            if not joining.any():
+                break
+            # Edges inside one tree stay inside it, so only the joining ones are kept
+            first, second = first[joining], second[joining]
+            root_first, root_second = root_first[joining], root_second[joining]
+            np.minimum.at(parent, np.maximum(root_first, root_second), np.minimum(root_first, root_second))
+            while True:
+                jumped = parent[parent]
+                if np.array_equal(jumped, parent):
+                    break
+                parent = jumped
+        labels = np.where(open_cells.reshape(-1), parent[runs], -1) if len(parent) else np.full(len(runs), -1)
+        self._labels, self._labels_version = labels, self.barrier_version
+        return labels
 
     def is_within_bounds(self, x, y):
         """Check if (x, y) is within the grid boundaries."""
@@ -37,4 +368,29 @@ class Environment:
 
     def is_barrier(self, x, y):
         """Check if (x, y) is a barrier."""
-        return (x, y) in self.barrier_locations
+        return self.is_within_bounds(x, y) and self.cells[x * self.rows + y] == 1
+
+    def cell_id(self, position):
+        """Convert an (x, y) position to its cell id."""
+        x, y = position
+        return x * self.rows + y
+
+    def cell_position(self, cell):
+        """Convert a cell id back to its (x, y) position."""
+        return divmod(cell, self.rows)
+
+    def neighbor_cells(self, cell):
+        """
+        Get the walkable neighbors of a cell id in up, down, left, right order.
+        Up and down are the cell id -/+ 1 and left and right are -/+ rows; the row
+        checks stop up/down from wrapping into the next column.
+        """
+        rows = self.rows
+        y = cell % rows
+        cells = self.cells
+        size = len(cells)
+        return [
+            neighbor
+            for neighbor in (cell - 1 if y else -1, cell + 1 if y != rows - 1 else -1, cell - rows, cell + rows)
+            if 0 <= neighbor < size and not cells[neighbor]
+        ]
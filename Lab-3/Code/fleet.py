@@ -0,0 +1,430 @@
+# fleet.py
+"""
+Fleet mode: many agents sharing one environment and its task_locations.
+
+Headless example:
+    python fleet.py --agents 100 --size 100x100 --tasks 300 --barriers 1500 --output ticks.csv
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Must be set before pygame is imported
+
+import argparse
+import colorsys
+import csv
+import heapq
+import random
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from environment import Environment, parse_size
+from search import NodeStore, distances_to
+
+INF = float('inf')
+RETRY_DELAY = 5  # Ticks an agent waits after failing to find a collision-free path
+CANDIDATE_TASKS = 16  # Closest tasks each idle agent bids on; the rest count as unreachable
+PLAN_EXPANSIONS = 16  # Space-time expansions a plan may use per step of its flat shortest path
+
+
+def assign(costs):
+    """
+    Minimum-cost assignment of rows to columns (Hungarian algorithm with potentials).
+    `costs` is a 2-D array that may hold inf for impossible pairs. Every row is matched
+    if there are at least as many columns, and vice versa. Returns the (row, column)
+    pairs whose cost is finite.
+    """
+    costs = np.asarray(costs, dtype=float)
+    transposed = costs.shape[0] > costs.shape[1]
+    if transposed:
+        costs = costs.T
+    n, m = costs.shape
+    if not n:
+        return []
+    finite = np.isfinite(costs)
+    # Impossible pairs get a cost larger than any complete assignment of possible ones
+    a = np.where(finite, costs, costs[finite].sum() + 1 if finite.any() else 1)
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)  # Row matched to each column, 0 if none (rows are 1-based here)
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, INF)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            current = a[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (current < minv[1:])
+            minv[1:][better] = current[better]
+            way[1:][better] = j0
+            candidates = np.where(free[1:], minv[1:], INF)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = []
+    for j in range(1, m + 1):
+        if p[j] and finite[p[j] - 1, j - 1]:
+            pairs.append((j - 1, p[j] - 1) if transposed else (p[j] - 1, j - 1))
+    return pairs
+
+
+class FleetAgent(pygame.sprite.Sprite):
+    """One member of a fleet. It only follows the timed paths the fleet plans for it."""
+
+    def __init__(self, index, position, grid_size, color):
+        super().__init__()
+        self.image = pygame.Surface((grid_size, grid_size))
+        self.image.fill(color)
+        self.rect = self.image.get_rect()
+        self.grid_size = grid_size
+        self.index = index
+        self.position = list(position)
+        self.rect.topleft = (self.position[0] * grid_size, self.position[1] * grid_size)
+        self.goal = None  # Task position the agent is heading for, None while idle
+        self.retry_at = 0  # Fleet time before which a boxed-in agent is not assigned again
+        self.plan_start = 0  # Fleet time at which plan[0] is occupied
+        self.plan = []  # Cell ids, one per time step from plan_start on
+        self.task_completed = 0
+        self.completed_tasks = []
+        self.completed_tasks_with_costs = []  # Steps taken per task, waiting included
+        self.total_path_cost = 0
+
+    def place(self, position):
+        self.position = list(position)
+        self.rect.topleft = (self.position[0] * self.grid_size, self.position[1] * self.grid_size)
+
+
+class Fleet:
+    """
+    N agents working through one environment's tasks without colliding.
+    Idle agents are matched to unclaimed tasks by a minimum-cost assignment on their
+    true path lengths. Each then plans a timed path with space-time A* against a
+    reservation table holding the (cell, time) entries of every other agent's plan,
+    so agents planned later route or wait around those planned earlier
+    (prioritized planning). Every agent's future is always fully reserved: its plan,
+    then its final cell from arrival on, which rules out both shared cells and swaps.
+    """
+
+    def __init__(self, environment, grid_size, count, starts=None, max_expansions=None):
+        self.environment = environment
+        if starts is None:
+            # Line the agents up from the top-left corner, like the single agents' start cell
+            starts = [
+                environment.cell_position(cell)
+                for cell in range(environment.columns * environment.rows)
+                if not environment.cells[cell] and environment.cell_position(cell) not in environment.task_locations
+            ][:count]
+        if len(starts) < count:
+            raise ValueError(f"only {len(starts)} free start cells for {count} agents")
+        self.agents = [
+            FleetAgent(index, start, grid_size, [int(c * 255) for c in colorsys.hsv_to_rgb(index / count, 0.8, 0.9)])
+            for index, start in enumerate(starts)
+        ]
+        self.node_store = NodeStore(environment.columns, environment.rows)
+        self.max_expansions = max_expansions  # Expansion cap per plan, or None to scale it with the distance
+        self.time = 0
+        self.timeline = {}  # cell -> {time: agent index} for every planned step
+        self.moves = set()  # (from cell, to cell, arrival time) of every planned step, to forbid swaps
+        self.parked = {}  # cell -> (time, agent index) the agent stays there from that time on
+        self.horizon = 0  # No plan reserves a step later than this
+        self.claimed = {}  # Task position -> index of the agent heading for it
+        self.replan_all = False
+        self.tick_times = []  # Planning seconds per tick
+        self.nodes_expanded = 0
+        self.plans = 0
+        self.failed_plans = 0
+        self.collisions = 0  # Shared cells or swaps seen while stepping; stays 0
+        for agent in self.agents:
+            self.parked[environment.cell_id(agent.position)] = (0, agent.index)
+        environment.barrier_listeners.add(self)
+
+    def close(self):
+        """Stop listening for barrier changes."""
+        self.environment.barrier_listeners.discard(self)
+
+    def barriers_changed(self, cells):
+        self.replan_all = True  # Planned paths may cross a new barrier
+
+    @property
+    def task_completed(self):
+        return sum(agent.task_completed for agent in self.agents)
+
+    @property
+    def total_path_cost(self):
+        return sum(agent.total_path_cost for agent in self.agents)
+
+    def tick(self):
+        """Plan for agents that need it, then move every agent one step. Returns the planning time."""
+        start_time = time.perf_counter()
+        if self.replan_all:
+            self.replan_all = False
+            self.replan_moving()
+        self.assign_tasks()
+        planning_time = time.perf_counter() - start_time
+        self.tick_times.append(planning_time)
+        self.step()
+        return planning_time
+
+    def assign_tasks(self):
+        """Match idle agents to unclaimed tasks and plan their paths, cheapest first."""
+        environment = self.environment
+        idle = [agent for agent in self.agents if agent.goal is None and agent.retry_at <= self.time]
+        free = [task for task in environment.task_locations if task not in self.claimed]
+        if not idle or not free:
+            return
+        labels = environment.component_labels()
+        regions = {}  # Free tasks by connected region, so nobody searches for tasks it cannot reach
+        for task in free:
+            regions.setdefault(labels[environment.cell_id(task)], []).append(task)
+        costs = np.full((len(idle), len(free)), INF)
+        columns = {task: column for column, task in enumerate(free)}
+        for row, agent in enumerate(idle):
+            reachable = regions.get(labels[environment.cell_id(agent.position)])
+            if not reachable:
+                continue
+            # Only the closest tasks; an agent left without one is matched on a later tick
+            nearest = distances_to(environment, self.node_store, agent.position, reachable, limit=CANDIDATE_TASKS)
+            for task, cost in nearest.items():
+                costs[row, columns[task]] = cost
+        for row, column in sorted(assign(costs), key=lambda pair: costs[pair]):
+            agent, task = idle[row], free[column]
+            if self.plan(agent, task):
+                agent.goal = task
+                self.claimed[task] = agent.index
+            else:
+                agent.retry_at = self.time + RETRY_DELAY  # Let the agents around it move on first
+
+    def replan_moving(self):
+        """Drop every plan in progress and plan them again in the same order, after a barrier change."""
+        moving = [agent for agent in self.agents if agent.goal is not None]
+        for agent in moving:
+            self.release(agent)
+            self.park(agent)
+        for agent in moving:
+            if not self.plan(agent, agent.goal):
+                # Walled off or boxed in for now; give the task back and try again next tick
+                del self.claimed[agent.goal]
+                agent.goal = None
+
+    def release(self, agent):
+        """Remove the agent's current and future reservations."""
+        for offset, cell in enumerate(agent.plan):
+            t = agent.plan_start + offset
+            if t >= self.time:
+                times = self.timeline.get(cell)
+                if times is not None and times.get(t) == agent.index:
+                    del times[t]
+                if offset:
+                    self.moves.discard((agent.plan[offset - 1], cell, t))
+        cell = self.environment.cell_id(agent.position)
+        if self.parked.get(cell, (0, None))[1] == agent.index:
+            del self.parked[cell]
+        if agent.plan and self.parked.get(agent.plan[-1], (0, None))[1] == agent.index:
+            del self.parked[agent.plan[-1]]
+        agent.plan = []
+
+    def park(self, agent):
+        """Keep the agent where it is from now on."""
+        self.parked[self.environment.cell_id(agent.position)] = (self.time, agent.index)
+
+    def blocked(self, cell, t, index):
+        """Whether another agent is planned to be in cell at time t."""
+        parked = self.parked.get(cell)
+        if parked is not None and parked[0] <= t and parked[1] != index:
+            return True
+        times = self.timeline.get(cell)
+        return times is not None and times.get(t, index) != index
+
+    def plan(self, agent, goal):
+        """
+        Space-time A* from the agent's cell now to goal, around every other reservation.
+        Waiting is a move that costs one step too. Past the last reserved time nothing
+        changes any more, so states there are merged per cell and waiting stops.
+        Reserves and stores the plan and returns True, or parks the agent and returns False.
+        """
+        environment = self.environment
+        neighbor_cells = environment.neighbor_cells
+        index = agent.index
+        self.release(agent)
+        self.plans += 1
+        now, horizon = self.time, self.horizon
+        start, goal = environment.cell_id(agent.position), environment.cell_id(goal)
+        # Agents parked by now never leave their cells. A flat search back from the goal around
+        # them shows whether waiting can help at all, and its distances are the A* heuristic:
+        # every cell it did not reach is further from the goal than the agent is.
+        parked = [cell for cell, (since, other) in self.parked.items() if since <= now and other != index]
+        store = self.node_store
+        position = tuple(agent.position)
+        distance = distances_to(environment, store, environment.cell_position(goal), [position], blocked=parked).get(position)
+        if distance is None:
+            self.failed_plans += 1
+            self.park(agent)
+            return False
+        g_scores, stamps, search = store.g_scores, store.stamps, store.search
+
+        def heuristic(cell):
+            return g_scores[cell] if stamps[cell] == search else distance + 1
+
+        max_expansions = self.max_expansions or PLAN_EXPANSIONS * (distance + 1)
+        open_set = [(heuristic(start), now, start)]
+        parents = {(start, now): None}
+        closed = set()
+        expanded = 0
+        found = None
+        while open_set and expanded < max_expansions:
+            _, t, cell = heapq.heappop(open_set)
+            key = (cell, t if t <= horizon else horizon + 1)
+            if key in closed:
+                continue
+            closed.add(key)
+            expanded += 1
+            if cell == goal and self.free_after(goal, t, index):
+                found = (cell, t)
+                break
+            options = neighbor_cells(cell)
+            if t <= horizon:
+                options.append(cell)  # Wait
+            arrival = t + 1
+            for neighbor in options:
+                if (neighbor, arrival) in parents or self.blocked(neighbor, arrival, index):
+                    continue
+                if neighbor != cell and (neighbor, cell, arrival) in self.moves:
+                    continue  # The agent coming the other way would swap with this one
+                parents[neighbor, arrival] = (cell, t)
+                heapq.heappush(open_set, (arrival - now + heuristic(neighbor), arrival, neighbor))
+        self.nodes_expanded += expanded
+
+        if found is None:
+            self.failed_plans += 1
+            self.park(agent)
+            return False
+        plan = []
+        state = found
+        while state is not None:
+            plan.append(state[0])
+            state = parents[state]
+        plan.reverse()
+
+        agent.plan_start, agent.plan = now, plan
+        for offset, cell in enumerate(plan):
+            self.timeline.setdefault(cell, {})[now + offset] = index
+            if offset:
+                self.moves.add((plan[offset - 1], cell, now + offset))
+        self.parked[goal] = (found[1], index)
+        self.horizon = max(self.horizon, found[1])
+        return True
+
+    def free_after(self, cell, t, index):
+        """Whether no other agent passes through cell after time t, so an agent can stop there."""
+        times = self.timeline.get(cell)
+        return not times or all(other == index or when <= t for when, other in times.items())
+
+    def step(self):
+        """Advance time by one and move every agent to its planned cell."""
+        environment = self.environment
+        self.time += 1
+        occupied = {}
+        for agent in self.agents:
+            previous = environment.cell_id(agent.position)
+            offset = self.time - agent.plan_start
+            if agent.plan and offset < len(agent.plan):
+                cell = agent.plan[offset]
+                agent.place(environment.cell_position(cell))
+                # Steps in the past are never checked again
+                times = self.timeline.get(previous)
+                if times is not None and times.get(self.time - 1) == agent.index:
+                    del times[self.time - 1]
+                if offset > 1:
+                    self.moves.discard((agent.plan[offset - 2], previous, self.time - 1))
+            else:
+                cell = previous
+            if cell in occupied or (cell != previous and occupied.get(previous) == cell):
+                self.collisions += 1
+            occupied[cell] = previous
+
+            if agent.goal is not None and offset >= len(agent.plan) - 1:
+                self.complete(agent)
+
+    def complete(self, agent):
+        """Finish the agent's task; it stays parked on the task cell until it gets another."""
+        task = agent.goal
+        del self.claimed[task]
+        agent.goal = None
+        if self.environment.task_locations.get(task) is not None and tuple(agent.position) == task:
+            task_number = self.environment.task_locations.pop(task)
+            cost = len(agent.plan) - 1
+            agent.task_completed += 1
+            agent.completed_tasks.append(task_number)
+            agent.completed_tasks_with_costs.append((task_number, cost))
+            agent.total_path_cost += cost
+
+    def run(self, max_ticks=None):
+        """Tick until every task is done, or no progress is made for a while. Returns the ticks taken."""
+        idle_ticks = 0
+        while self.environment.task_locations and (max_ticks is None or self.time < max_ticks):
+            moving = any(agent.goal is not None for agent in self.agents)
+            self.tick()
+            idle_ticks = 0 if moving else idle_ticks + 1
+            if idle_ticks > 10:
+                break  # Nothing left that any agent can reach
+        return self.time
+
+
+def main(argv=None):
+    # Set here rather than on import, so run.py (which imports Fleet) still opens a window
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Fleet agents are sprites, but the CLI displays nothing
+    parser = argparse.ArgumentParser(description="Run a fleet of agents headless and report planning time per tick.")
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--size", type=parse_size, default=(100, 100), help="grid size as COLUMNSxROWS")
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--barriers", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--output", help="CSV file for the planning time of every tick")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    columns, rows = args.size
+    environment = Environment(columns, rows, 1, args.tasks, args.barriers)
+    fleet = Fleet(environment, 1, args.agents)
+    start_time = time.perf_counter()
+    ticks = fleet.run(args.max_ticks)
+    wall_time = time.perf_counter() - start_time
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["tick", "planning_time"])
+            writer.writerows(enumerate(fleet.tick_times))
+    tick_times = fleet.tick_times or [0.0]
+    print(
+        f"{args.agents} agents, {ticks} ticks, {fleet.task_completed}/{args.tasks} tasks, "
+        f"path cost {fleet.total_path_cost}, collisions {fleet.collisions}\n"
+        f"planning per tick: mean {1000 * sum(tick_times) / len(tick_times):.2f} ms, "
+        f"max {1000 * max(tick_times):.2f} ms, first {1000 * tick_times[0]:.2f} ms\n"
+        f"{fleet.plans} plans ({fleet.failed_plans} failed), {fleet.nodes_expanded} nodes expanded, "
+        f"wall time {wall_time:.2f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
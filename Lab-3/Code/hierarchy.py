@@ -0,0 +1,272 @@
+# hierarchy.py
+import heapq
+from collections import deque
+
+INF = float('inf')
+
+
+class HierarchicalPlanner:
+    """
+    HPA* planner for grids far larger than the screen.
+    The grid is cut into square clusters. Where two neighboring clusters share an
+    open stretch of border, one or two transitions (cell pairs across the border)
+    become nodes of an abstract graph, and the distances between nodes of the same
+    cluster are precomputed. A query searches that small graph and then refines
+    each abstract edge into grid cells inside one cluster. Clusters touched by a
+    barrier change are rebuilt on the next query.
+    """
+
+    def __init__(self, environment, cluster_size=16):
+        self.environment = environment
+        self.cluster_size = cluster_size
+        self.cluster_columns = -(-environment.columns // cluster_size)
+        self.cluster_rows = -(-environment.rows // cluster_size)
+        self.borders = {}  # (cluster, cluster) -> [(cell, cell)] transitions, lower cluster first
+        self.transitions = {}  # cluster -> {node: [cells across the border]}
+        self.intra = {}  # cluster -> {node: [(node, cost)]} within the cluster
+        self.nodes_expanded = 0  # Abstract plus local expansions of the last query
+        self.dirty = set()
+        for cx in range(self.cluster_columns):
+            for cy in range(self.cluster_rows):
+                self.dirty.add((cx, cy))
+        environment.barrier_listeners.add(self)
+
+    def close(self):
+        """Stop listening for barrier changes."""
+        self.environment.barrier_listeners.discard(self)
+
+    def cluster_of(self, cell):
+        x, y = divmod(cell, self.environment.rows)
+        return (x // self.cluster_size, y // self.cluster_size)
+
+    def bounds(self, cluster):
+        """Inclusive (x0, y0, x1, y1) cell bounds of a cluster."""
+        cx, cy = cluster
+        size = self.cluster_size
+        return (cx * size, cy * size,
+                min((cx + 1) * size, self.environment.columns) - 1,
+                min((cy + 1) * size, self.environment.rows) - 1)
+
+    def barriers_changed(self, cells):
+        """Mark the clusters holding changed cells, and neighbors sharing their border, for rebuilding."""
+        rows = self.environment.rows
+        size = self.cluster_size
+        for cell in cells:
+            x, y = divmod(cell, rows)
+            cx, cy = x // size, y // size
+            self.dirty.add((cx, cy))
+            # A change on the cluster edge also alters the entrances of the cluster across it
+            if x % size == 0 and cx > 0:
+                self.dirty.add((cx - 1, cy))
+            if x % size == size - 1 and cx + 1 < self.cluster_columns:
+                self.dirty.add((cx + 1, cy))
+            if y % size == 0 and cy > 0:
+                self.dirty.add((cx, cy - 1))
+            if y % size == size - 1 and cy + 1 < self.cluster_rows:
+                self.dirty.add((cx, cy + 1))
+
+    def neighbor_clusters(self, cluster):
+        cx, cy = cluster
+        for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            if 0 <= nx < self.cluster_columns and 0 <= ny < self.cluster_rows:
+                yield (nx, ny)
+
+    def build_border(self, a, b):
+        """Find the transitions between two adjacent clusters, a being left of or above b."""
+        environment = self.environment
+        rows = environment.rows
+        cells = environment.cells
+        x0, y0, x1, y1 = self.bounds(a)
+        if b[0] > a[0]:
+            pairs = [(x1 * rows + y, (x1 + 1) * rows + y) for y in range(y0, y1 + 1)]
+        else:
+            pairs = [(x * rows + y1, x * rows + y1 + 1) for x in range(x0, x1 + 1)]
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and not cells[pair[0]] and not cells[pair[1]]:
+                run.append(pair)
+                continue
+            if run:
+                # Long entrances get a transition at each end, short ones one in the middle
+                if len(run) >= 6:
+                    transitions.extend((run[0], run[-1]))
+                else:
+                    transitions.append(run[len(run) // 2])
+                run = []
+        self.borders[a, b] = transitions
+
+    def rebuild(self):
+        """Recompute entrances and intra-cluster distances for every dirty cluster."""
+        if not self.dirty:
+            return
+        dirty, self.dirty = self.dirty, set()
+        for cluster in dirty:
+            for other in self.neighbor_clusters(cluster):
+                self.build_border(*sorted((cluster, other)))
+        # Neighbors gained or lost transitions on the rebuilt borders, so their node sets change too
+        affected = set(dirty)
+        for cluster in dirty:
+            affected.update(self.neighbor_clusters(cluster))
+        for cluster in affected:
+            transitions = {}
+            for other in self.neighbor_clusters(cluster):
+                key = tuple(sorted((cluster, other)))
+                for first, second in self.borders.get(key, ()):
+                    inside, across = (first, second) if key[0] == cluster else (second, first)
+                    transitions.setdefault(inside, []).append(across)
+            self.transitions[cluster] = transitions
+            self.intra[cluster] = {}
+            for node in transitions:
+                distances, _ = self.local_search(node, transitions, self.bounds(cluster))
+                self.intra[cluster][node] = [(other, cost) for other, cost in distances.items() if other != node]
+
+    def local_search(self, start, targets, bounds, parents=False):
+        """
+        Breadth-first search from start that stays inside bounds (x0, y0, x1, y1).
+        Returns ({target: cost} for reachable targets, parent links if requested).
+        """
+        environment = self.environment
+        rows = environment.rows
+        neighbor_cells = environment.neighbor_cells
+        x0, y0, x1, y1 = bounds
+        costs = {start: 0}
+        links = {start: -1} if parents else None
+        found = {}
+        queue = deque([start])
+        while queue and len(found) < len(targets):
+            current = queue.popleft()
+            self.nodes_expanded += 1
+            if current in targets:
+                found[current] = costs[current]
+            for neighbor in neighbor_cells(current):
+                if neighbor not in costs:
+                    x, y = divmod(neighbor, rows)
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        costs[neighbor] = costs[current] + 1
+                        if parents:
+                            links[neighbor] = current
+                        queue.append(neighbor)
+        return found, links
+
+    def local_path(self, start, goal, bounds):
+        """Shortest path between two cells of the same cluster, as cell ids."""
+        _, links = self.local_search(start, {goal}, bounds, parents=True)
+        path = [goal]
+        while links[path[-1]] != -1:
+            path.append(links[path[-1]])
+        path.reverse()
+        return path
+
+    def find_path(self, start, goal, exact=False):
+        """
+        Find a path between two (x, y) positions and return (path, cost).
+        The abstract path is refined into grid cells cluster by cluster, which can detour
+        through transition cells. With exact=True the result is replaced by a shortest
+        path: an A* over the whole grid that prunes every cell whose estimate exceeds the
+        refined path's cost, so it only explores around the route HPA* already found.
+        Returns (None, inf) if the goal is unreachable.
+        """
+        environment = self.environment
+        self.rebuild()
+        self.nodes_expanded = 0
+        start, goal = environment.cell_id(start), environment.cell_id(goal)
+        if environment.cells[start] or environment.cells[goal]:
+            return None, INF
+        start_cluster, goal_cluster = self.cluster_of(start), self.cluster_of(goal)
+
+        # Connect start and goal to the nodes of their clusters
+        start_edges, _ = self.local_search(start, set(self.transitions[start_cluster]) | {goal}, self.bounds(start_cluster))
+        goal_edges, _ = self.local_search(goal, set(self.transitions[goal_cluster]), self.bounds(goal_cluster))
+
+        abstract = self.abstract_search(start, goal, start_edges, goal_edges)
+        if abstract is None:
+            return None, INF
+
+        # Refine: transitions are single steps, everything else stays inside one cluster
+        cells = [start]
+        for a, b in zip(abstract, abstract[1:]):
+            if self.cluster_of(a) == self.cluster_of(b):
+                cells.extend(self.local_path(a, b, self.bounds(self.cluster_of(a)))[1:])
+            else:
+                cells.append(b)
+        if exact:
+            cells = self.bounded_path(start, goal, len(cells) - 1)
+        return [environment.cell_position(cell) for cell in cells], len(cells) - 1
+
+    def abstract_search(self, start, goal, start_edges, goal_edges):
+        """A* over the abstract graph with start and goal temporarily inserted. Returns the node list."""
+        rows = self.environment.rows
+        gx, gy = divmod(goal, rows)
+
+        def heuristic(cell):
+            x, y = divmod(cell, rows)
+            return abs(x - gx) + abs(y - gy)
+
+        g_scores = {start: 0}
+        parents = {start: None}
+        open_set = [(heuristic(start), start)]
+        closed = set()
+        while open_set:
+            _, current = heapq.heappop(open_set)
+            if current in closed:
+                continue
+            closed.add(current)
+            self.nodes_expanded += 1
+            if current == goal:
+                path = [goal]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                path.reverse()
+                return path
+
+            cluster = self.cluster_of(current)
+            if current == start:
+                edges = list(start_edges.items())
+            else:
+                edges = list(self.intra[cluster].get(current, ()))
+            edges.extend((across, 1) for across in self.transitions[cluster].get(current, ()))
+            if current in goal_edges:
+                edges.append((goal, goal_edges[current]))
+            for neighbor, cost in edges:
+                tentative = g_scores[current] + cost
+                if tentative < g_scores.get(neighbor, INF):
+                    g_scores[neighbor] = tentative
+                    parents[neighbor] = current
+                    heapq.heappush(open_set, (tentative + heuristic(neighbor), neighbor))
+        return None
+
+    def bounded_path(self, start, goal, bound):
+        """
+        Shortest path from start to goal as cell ids, by A* with the Manhattan distance.
+        Cells whose cost plus estimate exceeds bound are never queued; the estimate never
+        overestimates, so a shortest path survives as long as one costs at most bound.
+        """
+        environment = self.environment
+        rows = environment.rows
+        neighbor_cells = environment.neighbor_cells
+        gx, gy = divmod(goal, rows)
+        g_scores = {start: 0}
+        links = {start: -1}
+        open_set = [(0, 0, start)]  # (f, -g, cell): among equal f, the deepest cell first
+        while open_set:
+            _, negative_g, current = heapq.heappop(open_set)
+            if -negative_g > g_scores[current]:
+                continue  # Stale entry
+            self.nodes_expanded += 1
+            if current == goal:
+                path = [goal]
+                while links[path[-1]] != -1:
+                    path.append(links[path[-1]])
+                path.reverse()
+                return path
+            tentative = g_scores[current] + 1
+            for neighbor in neighbor_cells(current):
+                if tentative < g_scores.get(neighbor, INF):
+                    x, y = divmod(neighbor, rows)
+                    estimate = tentative + abs(x - gx) + abs(y - gy)
+                    if estimate <= bound:
+                        g_scores[neighbor] = tentative
+                        links[neighbor] = current
+                        heapq.heappush(open_set, (estimate, -tentative, neighbor))
+        return None
@@ -0,0 +1,155 @@
+# incremental.py
+import heapq
+
+INF = float('inf')
+
+
+class IncrementalPlanner:
+    """
+    D* Lite planner from a moving start to a fixed goal on the environment grid.
+    It searches backwards from the goal and keeps its g/rhs values between calls,
+    so when barriers are added or removed only the cells whose distance to the
+    goal actually changed are expanded again. The planner registers itself as a
+    barrier listener on the environment and picks changes up on the next plan().
+    """
+
+    def __init__(self, environment, goal):
+        self.environment = environment
+        self.goal = environment.cell_id(goal)
+        self.start = None
+        self.g = {}
+        self.rhs = {self.goal: 0}
+        self.km = 0  # Key modifier accumulated as the start moves
+        self.open_set = []  # (key, cell) entries; stale ones are skipped on pop
+        self.open_keys = {}  # cell -> key of its live entry in open_set
+        self.pending = set()  # Cells whose barrier state changed since the last plan
+        self.nodes_expanded = 0  # Expansions done by the last plan() call
+        self.heap_pushes = self.heap_pops = self.peak_open = 0  # Heap work of the last plan() call
+        self.total_nodes_expanded = 0
+        self.insert(self.goal, (self.heuristic(self.goal), 0))
+        environment.barrier_listeners.add(self)
+
+    def close(self):
+        """Stop listening for barrier changes."""
+        self.environment.barrier_listeners.discard(self)
+
+    def barriers_changed(self, cells):
+        """Record cells that were blocked or unblocked; they are repaired on the next plan()."""
+        self.pending.update(cells)
+
+    def heuristic(self, cell):
+        """Manhattan distance from the current start to cell."""
+        if self.start is None:
+            return 0
+        rows = self.environment.rows
+        (x1, y1), (x2, y2) = divmod(self.start, rows), divmod(cell, rows)
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    def adjacent(self, cell):
+        """All in-bounds neighbors of a cell, blocked or not."""
+        rows = self.environment.rows
+        size = len(self.environment.cells)
+        y = cell % rows
+        return [
+            neighbor
+            for neighbor in (cell - 1 if y else -1, cell + 1 if y != rows - 1 else -1, cell - rows, cell + rows)
+            if 0 <= neighbor < size
+        ]
+
+    def cost(self, a, b):
+        """Step cost between adjacent cells, infinite if either is a barrier."""
+        cells = self.environment.cells
+        return INF if cells[a] or cells[b] else 1
+
+    def calculate_key(self, cell):
+        best = min(self.g.get(cell, INF), self.rhs.get(cell, INF))
+        return (best + self.heuristic(cell) + self.km, best)
+
+    def insert(self, cell, key):
+        self.open_keys[cell] = key
+        heapq.heappush(self.open_set, (key, cell))
+        self.heap_pushes += 1
+        if len(self.open_set) > self.peak_open:
+            self.peak_open = len(self.open_set)
+
+    def top_key(self):
+        """Smallest live key in the open set, dropping stale entries on the way."""
+        open_set, open_keys = self.open_set, self.open_keys
+        while open_set:
+            key, cell = open_set[0]
+            if open_keys.get(cell) == key:
+                return key
+            heapq.heappop(open_set)
+            self.heap_pops += 1
+        return (INF, INF)
+
+    def update_vertex(self, cell):
+        if cell != self.goal:
+            g = self.g
+            self.rhs[cell] = min(
+                (self.cost(cell, neighbor) + g.get(neighbor, INF) for neighbor in self.adjacent(cell)),
+                default=INF,
+            )
+        self.open_keys.pop(cell, None)
+        if self.g.get(cell, INF) != self.rhs.get(cell, INF):
+            self.insert(cell, self.calculate_key(cell))
+
+    def compute_shortest_path(self):
+        g, rhs, start = self.g, self.rhs, self.start
+        expanded = 0
+        while self.top_key() < self.calculate_key(start) or rhs.get(start, INF) != g.get(start, INF):
+            key, cell = heapq.heappop(self.open_set)
+            self.heap_pops += 1
+            del self.open_keys[cell]
+            new_key = self.calculate_key(cell)
+            if key < new_key:
+                self.insert(cell, new_key)
+                continue
+            expanded += 1
+            if g.get(cell, INF) > rhs.get(cell, INF):
+                g[cell] = rhs[cell]
+                for neighbor in self.adjacent(cell):
+                    self.update_vertex(neighbor)
+            else:
+                g[cell] = INF
+                self.update_vertex(cell)
+                for neighbor in self.adjacent(cell):
+                    self.update_vertex(neighbor)
+            if not self.open_keys:
+                break  # Nothing left to expand; the start is unreachable
+        return expanded
+
+    def plan(self, start):
+        """
+        Return (path, cost) from start to the goal, repairing the previous search
+        for any barrier changes and start movement. Returns (None, inf) if unreachable.
+        """
+        start = self.environment.cell_id(start)
+        if self.start is not None and start != self.start:
+            self.km += self.heuristic(start)
+        self.start = start
+        self.heap_pushes = self.heap_pops = 0
+        self.peak_open = len(self.open_set)
+
+        changed, self.pending = self.pending, set()
+        for cell in changed:
+            self.update_vertex(cell)
+            for neighbor in self.adjacent(cell):
+                self.update_vertex(neighbor)
+
+        self.nodes_expanded = self.compute_shortest_path()
+        self.total_nodes_expanded += self.nodes_expanded
+        return self.extract_path()
+
+    def extract_path(self):
+        """Walk downhill on g from the start to the goal."""
+        g = self.g
+        cost = g.get(self.start, INF)
+        if cost == INF or self.environment.cells[self.start]:
+            return None, INF
+        cell = self.start
+        path = [self.environment.cell_position(cell)]
+        while cell != self.goal:
+            cell = min(self.adjacent(cell), key=lambda neighbor: self.cost(cell, neighbor) + g.get(neighbor, INF))
+            path.append(self.environment.cell_position(cell))
+        return path, cost
@@ -0,0 +1,113 @@
+# profiler.py
+"""
+Per-query search records for the Lab-3 agents.
+
+Set agent.profiler = SearchProfiler() and the agent records every search it runs
+and every nearest-task query it answers: targets, nodes expanded, heap pushes and
+pops, peak open-set size and compute time. Agents without a profiler only pay for
+a None check. Profilers from several runs can be merged and written as JSON or CSV.
+A profiler with a maxlen keeps only that many of the latest records, for long sessions.
+"""
+import csv
+import itertools
+import json
+from collections import deque
+
+FIELDS = [
+    "kind", "algorithm", "targets", "found", "cached", "path_length",
+    "nodes_expanded", "heap_pushes", "heap_pops", "peak_open", "wall_time",
+]
+COUNTERS = ["nodes_expanded", "heap_pushes", "heap_pops", "wall_time"]  # Summed from a query's searches
+
+
+class SearchProfiler:
+    """
+    Records of kind "search" (one finished search) and "query" (one find_nearest_task,
+    answered by the searches recorded since its mark, or by the path cache if none).
+    """
+
+    def __init__(self, records=(), maxlen=None):
+        self.records = deque(records, maxlen)  # The oldest records are dropped once maxlen is reached
+        self.recorded = len(self.records)  # Records added so far, dropped ones included
+
+    def record_search(self, algorithm, targets, found, nodes_expanded, heap_pushes, heap_pops, peak_open, wall_time):
+        """Add one finished search."""
+        self.records.append(dict(
+            kind="search", algorithm=algorithm, targets=targets, found=found, cached=False, path_length=0,
+            nodes_expanded=nodes_expanded, heap_pushes=heap_pushes, heap_pops=heap_pops,
+            peak_open=peak_open, wall_time=wall_time,
+        ))
+        self.recorded += 1
+
+    def mark(self):
+        """Position to pass to record_query once the query that starts now is answered."""
+        return self.recorded
+
+    def record_query(self, algorithm, mark, targets, path, wall_time):
+        """
+        Add a nearest-task query made of the searches recorded since `mark`. wall_time
+        is the compute time spent answering it, which includes the searches.
+        """
+        since = itertools.islice(self.records, max(len(self.records) - (self.recorded - mark), 0), None)
+        searches = [record for record in since if record["kind"] == "search"]
+        record = dict(
+            kind="query", algorithm=algorithm, targets=targets, found=bool(path), cached=not searches,
+            path_length=len(path) - 1 if path else 0,
+            peak_open=max((search["peak_open"] for search in searches), default=0),
+        )
+        for field in COUNTERS:
+            record[field] = sum(search[field] for search in searches)
+        record["wall_time"] = wall_time
+        self.records.append(record)
+        self.recorded += 1
+
+    def last(self, kind="query"):
+        """The most recent record of a kind, or None."""
+        return next((record for record in reversed(self.records) if record["kind"] == kind), None)
+
+    def merge(self, other):
+        """Append the records of another profiler (or any list of records)."""
+        records = list(other.records if isinstance(other, SearchProfiler) else other)
+        self.records.extend(records)
+        self.recorded += len(records)
+
+    def summary(self):
+        """Totals per kind and algorithm: record count, summed counters, peak open set and cache hits."""
+        groups = {}
+        for record in self.records:
+            group = groups.setdefault((record["kind"], record["algorithm"]), dict(
+                kind=record["kind"], algorithm=record["algorithm"], count=0, cached=0, peak_open=0,
+                **dict.fromkeys(COUNTERS, 0),
+            ))
+            group["count"] += 1
+            group["cached"] += record["cached"]
+            group["peak_open"] = max(group["peak_open"], record["peak_open"])
+            for field in COUNTERS:
+                group[field] += record[field]
+        return [groups[key] for key in sorted(groups)]
+
+    def write(self, path):
+        """Write the records as CSV, or as JSON with a summary if the path ends in .json."""
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "records": list(self.records)}, f, indent=2)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+    @classmethod
+    def load(cls, path):
+        """Read records written by write(), so profiles of separate runs can be merged."""
+        if path.endswith(".json"):
+            with open(path) as f:
+                return cls(json.load(f)["records"])
+        with open(path, newline="") as f:
+            records = list(csv.DictReader(f))
+        for record in records:
+            for field in ("targets", "path_length", "nodes_expanded", "heap_pushes", "heap_pops", "peak_open"):
+                record[field] = int(record[field])
+            record["wall_time"] = float(record["wall_time"])
+            record["found"], record["cached"] = record["found"] == "True", record["cached"] == "True"
+        return cls(records)
@@ -0,0 +1,160 @@
+# routing.py
+import weakref
+from search import NodeStore, distances_to
+
+_planners = weakref.WeakKeyDictionary()  # One cached planner per environment
+
+
+class RoutePlanner:
+    """
+    Plans the order in which an agent visits the tasks of an environment.
+    Shortest-path distances between the start and every task are computed once
+    with the grid search and cached until the barriers change. The order is a
+    nearest-neighbor tour improved with 2-opt and Or-opt moves.
+    """
+
+    def __init__(self, environment):
+        # Weak, as _planners is keyed on the environment and a strong reference would keep it alive
+        self.environment_ref = weakref.ref(environment)
+        self.node_store = NodeStore(environment.columns, environment.rows)
+        self.distances = {}  # position -> {position: cost} for every point searched from
+        self.cached_version = environment.barrier_version  # Barriers the cached distances were computed on
+
+    @property
+    def environment(self):
+        return self.environment_ref()
+
+    @classmethod
+    def for_environment(cls, environment):
+        """Return the planner cached for this environment, creating it on first use."""
+        planner = _planners.get(environment)
+        if planner is None:
+            planner = _planners[environment] = cls(environment)
+        return planner
+
+    def distance_matrix(self, points):
+        """Return the matrix of shortest-path costs between points, float('inf') where unreachable."""
+        if self.cached_version != self.environment.barrier_version:
+            # Barriers changed since the distances were computed
+            self.distances = {}
+            self.cached_version = self.environment.barrier_version
+        for point in points:
+            known = self.distances.get(point, {})
+            missing = [other for other in points if other not in known]
+            if missing:
+                known.update(distances_to(self.environment, self.node_store, point, missing))
+                # Points that were not reached are unreachable
+                known.update((other, float('inf')) for other in missing if other not in known)
+                self.distances[point] = known
+                # Steps cost the same both ways, so later searches from the other points can skip this one
+                for other in missing:
+                    self.distances.setdefault(other, {})[point] = known[other]
+        return [[self.distances[a][b] for b in points] for a in points]
+
+    def plan(self, start):
+        """Return the reachable task positions in the order an agent at start should visit them."""
+        tasks = list(self.environment.task_locations)
+        points = [start] + tasks
+        matrix = self.distance_matrix(points)
+        # Stops are indices into points; unreachable tasks are left out of the route
+        stops = [i for i in range(1, len(points)) if matrix[0][i] != float('inf')]
+        tour = improve_tour(matrix, nearest_neighbor_tour(matrix, stops))
+        return [points[i] for i in tour[1:]]
+
+
+def tour_cost(matrix, tour):
+    """Total cost of visiting the tour in order, without returning to the start."""
+    return sum(matrix[a][b] for a, b in zip(tour, tour[1:]))
+
+
+def nearest_neighbor_tour(matrix, stops):
+    """Greedy tour from index 0 that always moves to the closest unvisited stop."""
+    tour = [0]
+    unvisited = list(stops)
+    while unvisited:
+        last = tour[-1]
+        closest = min(unvisited, key=lambda stop: matrix[last][stop])
+        unvisited.remove(closest)
+        tour.append(closest)
+    return tour
+
+
+def improve_tour(matrix, tour):
+    """Apply improving 2-opt and Or-opt moves until neither finds one. The first stop stays fixed."""
+    tour = list(tour)
+    improved = True
+    while improved:
+        improved = two_opt(matrix, tour) | or_opt(matrix, tour)
+    return tour
+
+
+def two_opt(matrix, tour):
+    """Reverse segments of the open tour in place while that shortens it. Returns True if it changed."""
+    changed = False
+    improved = True
+    last = len(tour) - 1
+    while improved:
+        improved = False
+        for i in range(1, last):
+            for j in range(i + 1, last + 1):
+                a, b, c = tour[i - 1], tour[i], tour[j]
+                delta = matrix[a][c] - matrix[a][b]
+                if j < last:
+                    d = tour[j + 1]
+                    delta += matrix[b][d] - matrix[c][d]
+                if delta < 0:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    improved = changed = True
+    return changed
+
+
+def or_opt(matrix, tour, max_segment=3):
+    """Move short segments, optionally reversed, to a better place in the tour. Returns True if it changed."""
+    changed = False
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, len(tour) - length + 1):
+                segment = tour[i:i + length]
+                rest = tour[:i] + tour[i + length:]
+                first, last = segment[0], segment[-1]
+                prev = tour[i - 1]
+                after = tour[i + length] if i + length < len(tour) else None
+                removed = matrix[prev][first] + (matrix[last][after] - matrix[prev][after] if after is not None else 0)
+
+                best_delta, best_move = 0, None
+                for k in range(len(rest)):
+                    a = rest[k]
+                    b = rest[k + 1] if k + 1 < len(rest) else None
+                    for head, tail, reverse in ((first, last, False), (last, first, True)):
+                        added = matrix[a][head] + (matrix[tail][b] - matrix[a][b] if b is not None else 0)
+                        if added - removed < best_delta:
+                            best_delta, best_move = added - removed, (k, reverse)
+                if best_move:
+                    k, reverse = best_move
+                    tour[:] = rest[:k + 1] + (segment[::-1] if reverse else segment) + rest[k + 1:]
+                    improved = changed = True
+                    break
+            if improved:
+                break
+    return changed
+
+
+def next_route_leg(route, environment, find_path_to):
+    """
+    Drop finished stops from the front of route and return the path to the next one,
+    cut short at the first task it passes over. Returns None when the route is used up.
+    """
+    while route:
+        if route[0] not in environment.task_locations:
+            route.pop(0)  # Already completed on the way to an earlier stop
+            continue
+        path, _ = find_path_to(route[0])
+        if path is None or len(path) == 1:
+            route.pop(0)  # Walled off since the route was planned, or under the agent
+            continue
+        for index, position in enumerate(path[1:], 1):
+            if position in environment.task_locations:
+                return path[:index + 1]
+    return None
@@ -1,9 +1,15 @@
+import argparse
+import os
 import pygame
 import sys
-import copy  # For deep copying the environment
+import time
 from agent1 import Agent1
 from agent2 import Agent2
 from environment import Environment
+from scenario import load_environment
+from timestep import MODES, SimulationClock
+from fleet import Fleet
+from profiler import SearchProfiler
 
 # Constants
 WINDOW_WIDTH, WINDOW_HEIGHT = 900, 700
@@ -16,47 +22,226 @@ TEXT_COLOR = (0, 0, 0)
 BUTTON_COLOR = (0, 200, 0)
 BUTTON_HOVER_COLOR = (0, 255, 0)
 BUTTON_TEXT_COLOR = (255, 255, 255)
-MOVEMENT_DELAY = 50  # Milliseconds between movements
-
-def reset_simulation(agent1, environment, original_environment_data):
-    """Resets the agent1 and restores the environment to its original state."""
-    # Reset the agent1's state
-    agent1.position = [0, 0]  # Reset to starting position
-    agent1.rect.topleft = (0, 0)
-    agent1.task_completed = 0
-    agent1.completed_tasks = []
-    agent1.completed_tasks_with_costs = []
-    agent1.total_path_cost = 0
-    agent1.path = []
-    agent1.moving = False
-
-    # Restore the environment's state
-    environment.task_locations = copy.deepcopy(original_environment_data["task_locations"])
-    environment.barrier_locations = copy.deepcopy(original_environment_data["barrier_locations"])
-
-def main():
+MOVEMENT_DELAY = 50  # Milliseconds between movements (one simulation step) in realtime mode
+TURBO_STEPS = 20  # Simulation steps per frame in turbo mode, and per batch when headless
+PLAN_ROUTE = False  # Plan a full task tour before moving instead of always heading for the nearest task
+INCREMENTAL_PLANNING = True  # Repair paths with D* Lite when barriers are toggled (right click) mid-run
+PLANNING_BUDGET = 2000  # Search expansions per frame, so planning on large grids never stalls the window
+FLEET_SIZE = 4  # Agents sharing the grid in fleet mode
+PROFILE_SEARCHES = True  # Record every search and show the last nearest-task query in the status panel
+PROFILE_RECORDS = 1000  # Latest search and query records each agent's profiler keeps
+
+def reset_simulation(agent, environment, snapshot):
+    """Resets the agent and restores the environment to the snapshot taken at startup."""
+    agent.reset()
+    environment.restore(snapshot)
+
+def step_agent(agent, planning_budget):
+    """
+    Run one simulation step of a single agent: a move along its path, or the start of
+    the plan for its next task. With no planning_budget the plan is found right away.
+    Returns whether the agent can take another step immediately.
+    """
+    if agent.moving:
+        agent.move()
+        return True
+    if not agent.environment.task_locations:
+        return False
+    agent.start_planning(planning_budget)
+    if agent.planning and planning_budget is None:
+        agent.continue_planning()  # An unsliced search finishes in one call
+    return agent.moving
+
+
+def run_headless(environment, start):
+    """Run one agent, or the fleet, to completion without a window and at full speed."""
+    sim_clock = SimulationClock(MOVEMENT_DELAY / 1000, "headless", TURBO_STEPS)
+    start_time = time.perf_counter()
+    if start == "Fleet":
+        fleet = Fleet(environment, GRID_SIZE, FLEET_SIZE)
+        steps = fleet.run()
+        summary = f"Fleet ({FLEET_SIZE}): {fleet.task_completed} tasks, path cost {fleet.total_path_cost}"
+    else:
+        agent = (Agent1 if start == "A*" else Agent2)(environment, GRID_SIZE)
+        steps = 0
+        running = True
+        while running:
+            for _ in range(sim_clock.tick()):
+                if not step_agent(agent, None):
+                    running = False
+                    break
+                steps += 1
+        summary = (f"{start}: {agent.task_completed} tasks, path cost {agent.total_path_cost}, "
+                   f"{agent.search_stats.nodes_expanded} nodes expanded")
+    print(f"{summary}, {len(environment.task_locations)} tasks left, "
+          f"{steps} steps in {time.perf_counter() - start_time:.3f}s")
+
+
+class FrameRenderer:
+    """
+    Draws the simulation, touching only what changed since the previous frame.
+    Grid lines and barriers live on a cached background surface that is repainted
+    cell by cell when barriers change. Text is re-rendered only when its value
+    changes, and the screen is updated through dirty rects instead of a full flip.
+    """
+
+    def __init__(self, screen, environment, font):
+        self.screen = screen
+        self.environment = environment
+        self.font = font
+        self.background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.background.fill(BACKGROUND_COLOR)
+        for x in range(environment.columns):
+            for y in range(environment.rows):
+                self.paint_background_cell((x, y))
+        self.glyphs = {}  # Task number -> rendered label
+        self.texts = {}  # Screen position -> (text, rendered surface) last drawn there
+        self.labels = {}  # Button label -> rendered label
+        self.buttons = {}  # Button label -> (rect, color) last drawn
+        self.drawn_tasks = {}  # Task locations as last drawn
+        self.drawn_agents = {}  # Agent positions as last drawn
+        self.changed_cells = set()  # Cells whose barriers changed since the last frame
+        self.dirty_rects = []
+        self.full_redraw = True
+        environment.barrier_listeners.add(self)
+
+    def barriers_changed(self, cells):
+        self.changed_cells.update(self.environment.cell_position(cell) for cell in cells)
+
+    @staticmethod
+    def cell_rect(cell):
+        return pygame.Rect(cell[0] * GRID_SIZE, cell[1] * GRID_SIZE, GRID_SIZE, GRID_SIZE)
+
+    def paint_background_cell(self, cell):
+        """Paint the grid line and, if present, the barrier of one cell onto the background."""
+        rect = self.cell_rect(cell)
+        self.background.fill(BACKGROUND_COLOR, rect)
+        pygame.draw.rect(self.background, (200, 200, 200), rect, 1)  # Draw grid lines
+        if self.environment.is_barrier(*cell):
+            pygame.draw.rect(self.background, BARRIER_COLOR, rect)
+
+    def draw_cell(self, cell, agents):
+        """Redraw one grid cell from the background, with its task and any agent on top."""
+        rect = self.cell_rect(cell)
+        self.screen.blit(self.background, rect, rect)
+        task_number = self.environment.task_locations.get(cell)
+        if task_number is not None:
+            pygame.draw.rect(self.screen, TASK_COLOR, rect)
+            glyph = self.glyphs.get(task_number)
+            if glyph is None:
+                glyph = self.glyphs[task_number] = self.font.render(str(task_number), True, (255, 255, 255))
+            self.screen.blit(glyph, glyph.get_rect(center=rect.center))
+        agent = agents.get(cell)
+        if agent is not None:
+            self.screen.blit(agent.image, agent.rect)
+        self.dirty_rects.append(rect)
+
+    def draw_text(self, text, position):
+        """Draw a status line, re-rendering it only if it changed."""
+        drawn = self.texts.get(position)
+        if drawn is not None and drawn[0] == text and not self.full_redraw:
+            return
+        surface = drawn[1] if drawn is not None and drawn[0] == text else self.font.render(text, True, TEXT_COLOR)
+        self.texts[position] = (text, surface)
+        # Clear the whole line so a shorter text leaves nothing behind
+        rect = pygame.Rect(position[0], position[1], WINDOW_WIDTH + STATUS_WIDTH - position[0], surface.get_height())
+        self.screen.fill(BACKGROUND_COLOR, rect)
+        self.screen.blit(surface, position)
+        self.dirty_rects.append(rect)
+
+    def draw_button(self, label, rect, color):
+        """Draw a button if its position or hover color changed."""
+        key = (tuple(rect), color)
+        if self.buttons.get(label) == key and not self.full_redraw:
+            return
+        self.buttons[label] = key
+        pygame.draw.rect(self.screen, color, rect)
+        surface = self.labels.get(label)
+        if surface is None:
+            surface = self.labels[label] = self.font.render(label, True, BUTTON_TEXT_COLOR)
+        self.screen.blit(surface, surface.get_rect(center=rect.center))
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def draw_grid(self, agents):
+        """Draw the grid area: everything on a full redraw, otherwise only changed cells."""
+        environment = self.environment
+        for cell in self.changed_cells:
+            self.paint_background_cell(cell)
+        agent_cells = {tuple(agent.position): agent for agent in agents}
+        if self.full_redraw:
+            self.screen.fill(BACKGROUND_COLOR)  # Clears the status panel too, which the background does not cover
+            self.screen.blit(self.background, (0, 0))
+            dirty_cells = set(environment.task_locations) | set(agent_cells)
+        else:
+            dirty_cells = set(self.changed_cells)
+            if environment.task_locations != self.drawn_tasks:
+                dirty_cells.update(
+                    cell for cell in set(environment.task_locations) | set(self.drawn_tasks)
+                    if environment.task_locations.get(cell) != self.drawn_tasks.get(cell)
+                )
+            dirty_cells.update(
+                cell for cell in set(agent_cells) | set(self.drawn_agents)
+                if agent_cells.get(cell) is not self.drawn_agents.get(cell)
+            )
+        for cell in dirty_cells:
+            self.draw_cell(cell, agent_cells)
+        self.changed_cells.clear()
+        self.drawn_tasks = dict(environment.task_locations)
+        self.drawn_agents = agent_cells
+
+    def present(self):
+        """Push this frame's changes to the display."""
+        if self.full_redraw:
+            # Draw the status panel separator
+            pygame.draw.line(self.screen, (0, 0, 0), (WINDOW_WIDTH, 0), (WINDOW_WIDTH, WINDOW_HEIGHT))
+            pygame.display.flip()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+        self.full_redraw = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grid simulation of the A*, UCS and fleet agents.")
+    parser.add_argument("scenario", nargs="?", help="scenario file to load instead of a random map (see scenario.py)")
+    parser.add_argument("--mode", choices=MODES, default="realtime",
+                        help="realtime steps every MOVEMENT_DELAY, turbo runs --turbo-steps per frame, "
+                             "headless runs --start to completion without a window")
+    parser.add_argument("--turbo-steps", type=int, default=TURBO_STEPS, help="steps per frame in turbo mode")
+    parser.add_argument("--render-every", type=int, default=1, help="draw only every Nth frame")
+    parser.add_argument("--start", choices=("A*", "UCS", "Fleet"), help="start this simulation right away")
+    args = parser.parse_args(argv)
+
+    # Initialize environment
+    if args.scenario:
+        environment = load_environment(args.scenario, GRID_SIZE)
+    else:
+        environment = Environment(WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE, num_tasks=10, num_barriers=15)
+    if args.mode == "headless":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # The agents are sprites, but nothing is displayed
+        run_headless(environment, args.start or "A*")
+        return
+
     pygame.init()
 
     # Set up display with an additional status panel
     screen = pygame.display.set_mode((WINDOW_WIDTH + STATUS_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Pygame AI Grid Simulation")
 
-    # Clock to control frame rate
-    clock = pygame.time.Clock()
+    # Clock that hands out simulation steps and decides which frames are drawn
+    sim_clock = SimulationClock(MOVEMENT_DELAY / 1000, args.mode, args.turbo_steps, args.render_every)
     font = pygame.font.Font(None, 24)
 
-    # Initialize environment and agents
-    environment = Environment(WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE, num_tasks=10, num_barriers=15)
+    # Initialize agents
     agent1 = Agent1(environment, GRID_SIZE)
     agent2 = Agent2(environment, GRID_SIZE)  # Assuming Agent2's logic is implemented in Agent1 but with UCS
-    all_sprites = pygame.sprite.Group()
-    all_sprites.add(agent1, agent2)
+    agent1.incremental = agent2.incremental = INCREMENTAL_PLANNING
+    if PROFILE_SEARCHES:
+        agent1.profiler, agent2.profiler = SearchProfiler(maxlen=PROFILE_RECORDS), SearchProfiler(maxlen=PROFILE_RECORDS)
+    renderer = FrameRenderer(screen, environment, font)
 
-    # Make a backup of the original environment data
-    original_environment_data = {
-        "task_locations": copy.deepcopy(environment.task_locations),
-        "barrier_locations": copy.deepcopy(environment.barrier_locations),
-    }
+    # Snapshot the original tasks and barriers; the grid is shared until a barrier is toggled
+    snapshot = environment.snapshot()
 
     # Start buttons for both agents
     button_width, button_height = 150, 50
@@ -68,148 +253,168 @@ def main():
     button2_y = button1_y + button_height + 20  # Positioned below Agent1 button
     button2_rect = pygame.Rect(button2_x, button2_y, button_width, button_height)
 
+    button3_rect = pygame.Rect(button1_x, button2_y + button_height + 20, button_width, button_height)  # Fleet button
+
     # Simulation states
     simulation_started = {"Agent1": False, "Agent2": False}
     active_agent = None  # Keeps track of which agent is running
+    fleet = None  # Agents sharing the grid while fleet mode runs
 
-    # Variables for movement delay
-    last_move_time = pygame.time.get_ticks()
+    if args.start:
+        # Press the start button on the first frame
+        start_rect = {"A*": button1_rect, "UCS": button2_rect, "Fleet": button3_rect}[args.start]
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start_rect.center, button=1))
 
     # Main loop
     running = True
     while running:
-        clock.tick(60)  # Limit to 60 FPS
+        steps = sim_clock.tick()  # Waits for the next frame (60 FPS)
 
         # Event handling
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
 
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+                # Right click toggles a barrier on the grid
+                cell = (event.pos[0] // GRID_SIZE, event.pos[1] // GRID_SIZE)
+                running_agents = fleet.agents if fleet else [active_agent] if active_agent else []
+                if environment.is_within_bounds(*cell) and cell not in environment.task_locations:
+                    if cell in environment.barrier_locations:
+                        environment.barrier_locations.remove(cell)
+                    elif all(cell != tuple(agent.position) for agent in running_agents):
+                        environment.barrier_locations.add(cell)
+                continue
+
             if event.type == pygame.MOUSEBUTTONDOWN:
+                if fleet and (button1_rect.collidepoint(event.pos) or button2_rect.collidepoint(event.pos)):
+                    fleet.close()  # Leave fleet mode
+                    fleet = None
+
                 if button1_rect.collidepoint(event.pos):
                     # Reset Agent1 and start its simulation
-                    reset_simulation(agent1, environment, original_environment_data)
+                    reset_simulation(agent1, environment, snapshot)
                     simulation_started["Agent1"] = True
                     simulation_started["Agent2"] = False  # Stop Agent2
                     active_agent = agent1
                     if environment.task_locations:
-                        agent1.find_nearest_task()
+                        if PLAN_ROUTE:
+                            agent1.plan_route()
+                        agent1.start_planning(PLANNING_BUDGET)
 
                 if button2_rect.collidepoint(event.pos):
                     # Reset Agent2 and start its simulation
-                    reset_simulation(agent2, environment, original_environment_data)
+                    reset_simulation(agent2, environment, snapshot)
                     simulation_started["Agent2"] = True
                     simulation_started["Agent1"] = False  # Stop Agent1
                     active_agent = agent2
                     if environment.task_locations:
-                        agent2.find_nearest_task()
-
-        # Clear the screen
-        screen.fill(BACKGROUND_COLOR)
-
-        # Draw grid and barriers
-        for x in range(environment.columns):
-            for y in range(environment.rows):
-                rect = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-                pygame.draw.rect(screen, (200, 200, 200), rect, 1)  # Draw grid lines
-
-        # Draw barriers
-        for (bx, by) in environment.barrier_locations:
-            barrier_rect = pygame.Rect(bx * GRID_SIZE, by * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            pygame.draw.rect(screen, BARRIER_COLOR, barrier_rect)
-
-        # Draw tasks with numbers
-        for (tx, ty), task_number in environment.task_locations.items():
-            task_rect = pygame.Rect(tx * GRID_SIZE, ty * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-            pygame.draw.rect(screen, TASK_COLOR, task_rect)
-            # Draw task number
-            task_num_surface = font.render(str(task_number), True, (255, 255, 255))
-            task_num_rect = task_num_surface.get_rect(center=task_rect.center)
-            screen.blit(task_num_surface, task_num_rect)
-
-        # Draw active agent only
-        if active_agent == agent1:
-            agent2.kill()  # Remove agent2 from the display
-            agent1.add(all_sprites)  # Ensure agent1 is in the sprite group
-        elif active_agent == agent2:
-            agent1.kill()  # Remove agent1 from the display
-            agent2.add(all_sprites)  # Ensure agent2 is in the sprite group
-        all_sprites.draw(screen)
-
-        # Display simulation information for both agents
-        status_x = WINDOW_WIDTH + 10
-        line_height = 30
-        y_offset = 20
-
-        for agent_name, agent in [("Agent1", agent1), ("Agent2", agent2)]:
-            # Display algorithm name
-            algorithm_text = f"{agent_name} - Algorithm: {'A* Search' if agent == agent1 else 'UCS'}"
-            algorithm_surface = font.render(algorithm_text, True, TEXT_COLOR)
-            screen.blit(algorithm_surface, (status_x, y_offset))
-
-            # Display tasks completed
-            task_status_text = f"Tasks Completed: {agent.task_completed}"
-            task_status_surface = font.render(task_status_text, True, TEXT_COLOR)
-            screen.blit(task_status_surface, (status_x, y_offset + line_height))
-
-            # Display agent position
-            position_text = f"Position: {agent.position}"
-            position_surface = font.render(position_text, True, TEXT_COLOR)
-            screen.blit(position_surface, (status_x, y_offset + 2 * line_height))
-
-            # Display completed tasks with costs
-            completed_tasks_text = "Completed Tasks: " + ", ".join(
-                [f"{task} (Cost: {cost})" for task, cost in agent.completed_tasks_with_costs]
-            )
-            completed_tasks_surface = font.render(completed_tasks_text, True, TEXT_COLOR)
-            screen.blit(completed_tasks_surface, (status_x, y_offset + 3 * line_height))
-
-            # Display total path cost
-            total_path_cost_text = f"Total Path Cost: {agent.total_path_cost}"
-            total_path_cost_surface = font.render(total_path_cost_text, True, TEXT_COLOR)
-            screen.blit(total_path_cost_surface, (status_x, y_offset + 4 * line_height))
-
-            # Increment y_offset for the next agent
-            y_offset += 6 * line_height
-
-        # Draw buttons
-        mouse_pos = pygame.mouse.get_pos()
-
-        # Calculate button positions dynamically based on the displayed information
-        y_offset += 10  # Add some space between the last agent's information and the buttons
-
-        # Button 1
-        button1_color = BUTTON_HOVER_COLOR if button1_rect.collidepoint(mouse_pos) else BUTTON_COLOR
-        button1_rect.top = y_offset  # Dynamically adjust the button's Y position
-        pygame.draw.rect(screen, button1_color, button1_rect)
-        button1_surface = font.render("A* Search", True, BUTTON_TEXT_COLOR)
-        button1_text_rect = button1_surface.get_rect(center=button1_rect.center)
-        screen.blit(button1_surface, button1_text_rect)
-
-        # Button 2
-        button2_color = BUTTON_HOVER_COLOR if button2_rect.collidepoint(mouse_pos) else BUTTON_COLOR
-        button2_rect.top = button1_rect.bottom + 20  # Position button2 below button1
-        pygame.draw.rect(screen, button2_color, button2_rect)
-        button2_surface = font.render("UCS Search", True, BUTTON_TEXT_COLOR)
-        button2_text_rect = button2_surface.get_rect(center=button2_rect.center)
-        screen.blit(button2_surface, button2_text_rect)
-
-
-        # Automatic movement with delay
-        current_time = pygame.time.get_ticks()
+                        if PLAN_ROUTE:
+                            agent2.plan_route()
+                        agent2.start_planning(PLANNING_BUDGET)
+
+                if button3_rect.collidepoint(event.pos):
+                    # Restore the environment and start a fleet on it
+                    if fleet:
+                        fleet.close()
+                    for agent in (agent1, agent2):
+                        agent.reset()
+                    environment.restore(snapshot)
+                    fleet = Fleet(environment, GRID_SIZE, FLEET_SIZE)
+                    simulation_started["Agent1"] = simulation_started["Agent2"] = False
+                    active_agent = None
+
+        if sim_clock.render_due():
+            # Draw the grid, tasks and the active agent (both agents share the start cell until one runs)
+            renderer.draw_grid(fleet.agents if fleet else [active_agent or agent1])
+
+            # Display simulation information for both agents
+            status_x = WINDOW_WIDTH + 10
+            line_height = 30
+            y_offset = 20
+
+            for agent_name, agent in [("Agent1", agent1), ("Agent2", agent2)]:
+                # Display algorithm name
+                renderer.draw_text(f"{agent_name} - Algorithm: {'A* Search' if agent == agent1 else 'UCS'}", (status_x, y_offset))
+
+                # Display tasks completed
+                renderer.draw_text(f"Tasks Completed: {agent.task_completed}", (status_x, y_offset + line_height))
+
+                # Display agent position
+                renderer.draw_text(f"Position: {agent.position}", (status_x, y_offset + 2 * line_height))
+
+                # Display completed tasks with costs
+                completed_tasks_text = "Completed Tasks: " + ", ".join(
+                    [f"{task} (Cost: {cost})" for task, cost in agent.completed_tasks_with_costs]
+                )
+                renderer.draw_text(completed_tasks_text, (status_x, y_offset + 3 * line_height))
+
+                # Display total path cost
+                renderer.draw_text(f"Total Path Cost: {agent.total_path_cost}", (status_x, y_offset + 4 * line_height))
+
+                # Display search progress while the agent is planning, otherwise the cost of its last query
+                planning_text = f"Planning: {agent.planning.nodes_expanded} nodes expanded" if agent.planning else ""
+                query = agent.profiler.last() if agent.profiler and not agent.planning else None
+                if query:
+                    source = "cached" if query["cached"] else f"{query['nodes_expanded']} nodes, peak open {query['peak_open']}"
+                    planning_text = f"Last search: {source}, {1000 * query['wall_time']:.1f} ms"
+                renderer.draw_text(planning_text, (status_x, y_offset + 5 * line_height))
+
+                # Increment y_offset for the next agent
+                y_offset += 6 * line_height
+
+            # Draw buttons
+            mouse_pos = pygame.mouse.get_pos()
+
+            # Calculate button positions dynamically based on the displayed information
+            y_offset += 10  # Add some space between the last agent's information and the buttons
+
+            # Button 1
+            button1_color = BUTTON_HOVER_COLOR if button1_rect.collidepoint(mouse_pos) else BUTTON_COLOR
+            button1_rect.top = y_offset  # Dynamically adjust the button's Y position
+            renderer.draw_button("A* Search", button1_rect, button1_color)
+
+            # Button 2
+            button2_color = BUTTON_HOVER_COLOR if button2_rect.collidepoint(mouse_pos) else BUTTON_COLOR
+            button2_rect.top = button1_rect.bottom + 20  # Position button2 below button1
+            renderer.draw_button("UCS Search", button2_rect, button2_color)
+
+            # Button 3
+            button3_color = BUTTON_HOVER_COLOR if button3_rect.collidepoint(mouse_pos) else BUTTON_COLOR
+            button3_rect.top = button2_rect.bottom + 20  # Position button3 below button2
+            renderer.draw_button(f"Fleet ({FLEET_SIZE})", button3_rect, button3_color)
+
+            # Display fleet information below the buttons
+            fleet_lines = ["", "", ""]
+            if fleet:
+                last_tick = 1000 * fleet.tick_times[-1] if fleet.tick_times else 0
+                slowest_tick = 1000 * max(fleet.tick_times, default=0)
+                fleet_lines = [
+                    f"Fleet: {len(fleet.agents)} agents, Tasks Completed: {fleet.task_completed}",
+                    f"Total Path Cost: {fleet.total_path_cost}",
+                    f"Planning: {last_tick:.1f} ms last tick, {slowest_tick:.1f} ms max",
+                ]
+            for index, text in enumerate(fleet_lines):
+                renderer.draw_text(text, (status_x, button3_rect.bottom + 20 + index * line_height))
+
+        # Run the simulation steps the clock handed out for this frame
+        if fleet:
+            for _ in range(steps):
+                if not environment.task_locations:
+                    break
+                fleet.tick()
         if active_agent and simulation_started[f"Agent{'1' if active_agent == agent1 else '2'}"]:
-            if current_time - last_move_time > MOVEMENT_DELAY:
-                if not active_agent.moving and environment.task_locations:
-                    active_agent.find_nearest_task()
-                elif active_agent.moving:
-                    active_agent.move()
-                last_move_time = current_time
-
-        # Draw the status panel separator
-        pygame.draw.line(screen, (0, 0, 0), (WINDOW_WIDTH, 0), (WINDOW_WIDTH, WINDOW_HEIGHT))
-
-        # Update the display
-        pygame.display.flip()
+            if active_agent.planning:
+                active_agent.continue_planning()  # One slice of the search per frame
+                sim_clock.hold()  # Steps wait for the plan instead of piling up
+            else:
+                for _ in range(steps):
+                    if not step_agent(active_agent, PLANNING_BUDGET):
+                        break
+
+        # Update only the parts of the display that changed
+        if sim_clock.render_due():
+            renderer.present()
 
     # Quit Pygame properly
     pygame.quit()
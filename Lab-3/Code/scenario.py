@@ -0,0 +1,139 @@
+# scenario.py
+"""
+Save and load Lab-3 environments as binary scenario files, so a map can be rerun or shared.
+
+A scenario file is a short header followed by the raw arrays:
+
+    magic (8 bytes) | format version (uint32) | header length (uint32) | JSON header | arrays
+
+The JSON header names every array with its dtype, shape and byte offset. Offsets are
+aligned, so loading memory-maps the arrays instead of reading them: opening a huge map
+costs next to nothing and the grid is paged in as searches touch it.
+
+Example:
+    python scenario.py save maps/2000.scn --size 2000x2000 --tasks 100 --barriers 1600000 --seed 1
+    python scenario.py info maps/2000.scn
+"""
+import argparse
+import json
+import random
+import struct
+
+import numpy as np
+
+from environment import Environment, parse_size
+
+MAGIC = b"CSE366SC"
+FORMAT_VERSION = 1
+ALIGNMENT = 64  # Byte alignment of every array, so each one can be mapped and read in place
+PREAMBLE = struct.Struct("<8sII")  # Magic, format version, header length
+
+
+def write_arrays(path, kind, arrays, **meta):
+    """Write named numpy arrays and a few JSON-serializable values to a scenario file."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    entries = []
+    offset = 0
+    for name, array in arrays.items():
+        entries.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    # Offsets above are relative to the end of the header, which is padded to the alignment
+    header = json.dumps({"kind": kind, "meta": meta, "arrays": entries}).encode()
+    start = -(-(PREAMBLE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+    header = header.ljust(start - PREAMBLE.size)
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for entry, array in zip(entries, arrays.values()):
+            f.seek(start + entry["offset"])
+            f.write(array.tobytes())
+        f.truncate(start + offset)
+
+
+def read_header(path):
+    """Return the parsed JSON header of a scenario file and the byte offset its arrays start at."""
+    with open(path, "rb") as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise ValueError(f"{path} is not a scenario file")
+        magic, version, length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a scenario file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses scenario format {version}, newer than the supported {FORMAT_VERSION}")
+        header = json.loads(f.read(length))
+    return header, PREAMBLE.size + length
+
+
+def read_arrays(path, kind, mmap=True):
+    """
+    Read a scenario file of the given kind and return its (meta, arrays) pair.
+    With mmap=True the arrays are read-only memory maps of the file.
+    """
+    header, start = read_header(path)
+    if header["kind"] != kind:
+        raise ValueError(f"{path} holds a {header['kind']} scenario, not {kind}")
+    arrays = {}
+    with open(path, "rb") as f:
+        for entry in header["arrays"]:
+            dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+            if mmap and np.prod(shape):
+                array = np.memmap(path, dtype=dtype, mode="r", offset=start + entry["offset"], shape=shape)
+            else:
+                f.seek(start + entry["offset"])
+                array = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            arrays[entry["name"]] = array
+    return header["meta"], arrays
+
+
+def save_environment(environment, path, **meta):
+    """Save the occupancy grid, tasks and unreachable tasks of an environment."""
+    tasks = np.array([(x, y, number) for (x, y), number in environment.task_locations.items()], dtype=np.int64)
+    unreachable = np.array(environment.unreachable_tasks, dtype=np.int64)
+    write_arrays(
+        path, "lab3-grid",
+        {"grid": environment.grid, "tasks": tasks.reshape(-1, 3), "unreachable_tasks": unreachable.reshape(-1, 2)},
+        num_barriers=int(np.count_nonzero(environment.grid)), **meta,
+    )
+
+
+def load_environment(path, grid_size=1, mmap=True):
+    """
+    Load an environment saved with save_environment. With mmap=True the grid stays a
+    read-only map of the file until a barrier changes, when the environment copies it.
+    """
+    _, arrays = read_arrays(path, "lab3-grid", mmap)
+    grid = arrays["grid"]
+    if grid.dtype != np.uint8 or grid.ndim != 2:
+        raise ValueError(f"{path} has a {grid.dtype} grid of {grid.ndim} dimensions, expected 2-D uint8")
+    tasks = {(x, y): number for x, y, number in arrays["tasks"].tolist()}
+    unreachable = [tuple(location) for location in arrays["unreachable_tasks"].tolist()]
+    return Environment.from_arrays(grid, tasks, grid_size, unreachable)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and inspect Lab-3 scenario files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    save = commands.add_parser("save", help="generate a seeded map and save it")
+    save.add_argument("path")
+    save.add_argument("--size", type=parse_size, default=(22, 17), help="grid size as COLUMNSxROWS")
+    save.add_argument("--tasks", type=int, default=10)
+    save.add_argument("--barriers", type=int, default=15)
+    save.add_argument("--seed", type=int, default=0)
+    info = commands.add_parser("info", help="print the header of a scenario file")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "save":
+        random.seed(args.seed)
+        columns, rows = args.size
+        save_environment(Environment(columns, rows, 1, args.tasks, args.barriers), args.path, seed=args.seed)
+    header, _ = read_header(args.path)
+    print(f"{args.path}: {header['kind']} {json.dumps(header['meta'])}")
+    for entry in header["arrays"]:
+        print(f"  {entry['name']}: {entry['dtype']} {tuple(entry['shape'])}")
+
+
+if __name__ == "__main__":
+    main()
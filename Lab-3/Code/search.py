@@ -0,0 +1,219 @@
+# search.py
+import heapq
+import time
+from array import array
+from collections import deque
+
+
+class NodeStore:
+    """
+    Flat per-cell search state shared by the grid searches.
+    Every array is indexed by cell id (x * rows + y), so a search on a
+    columns x rows grid always uses the same 16 bytes per cell no matter how
+    much of the grid it explores. Entries are only valid for the search whose
+    stamp they carry, which lets a new search start without clearing anything.
+    """
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+        size = columns * rows
+        self.g_scores = array('i', [0]) * size  # Best known cost from the start
+        self.parents = array('i', [-1]) * size  # Predecessor cell id on the best path
+        self.stamps = array('I', [0]) * size  # Search in which g_scores/parents were written
+        self.closed = array('I', [0]) * size  # Search in which the cell was expanded
+        self.search = 0
+
+    def begin(self):
+        """Start a new search and return its stamp."""
+        self.search += 1
+        return self.search
+
+    def cell_id(self, position):
+        """Convert an (x, y) position to its cell id."""
+        x, y = position
+        return x * self.rows + y
+
+    def position(self, cell):
+        """Convert a cell id back to its (x, y) position."""
+        return divmod(cell, self.rows)
+
+
+class SearchStats:
+    """Running totals of the work done by an agent's searches."""
+
+    def __init__(self):
+        self.searches = 0
+        self.nodes_expanded = 0
+        self.heap_pushes = 0
+
+    def record(self, nodes_expanded, heap_pushes):
+        """Add the counts from one finished search."""
+        self.searches += 1
+        self.nodes_expanded += nodes_expanded
+        self.heap_pushes += heap_pushes
+
+
+class SearchTask:
+    """
+    A search that runs a slice at a time so the frame loop never waits on it.
+    `steps` is a search generator that yields its running expansion count after
+    every slice and returns its result when done. The task also listens for
+    barrier changes, since a search that saw only part of a change is stale.
+    """
+
+    def __init__(self, environment, steps):
+        self.environment = environment
+        self.steps = steps
+        self.nodes_expanded = 0
+        self.stale = False
+        self.done = False
+        self.result = None
+        environment.barrier_listeners.add(self)
+
+    def barriers_changed(self, cells):
+        self.stale = True
+
+    def advance(self):
+        """Run the next slice of the search. Returns True once it has finished."""
+        if not self.done:
+            try:
+                self.nodes_expanded = next(self.steps)
+            except StopIteration as finished:
+                self.done = True
+                self.result = finished.value
+                self.close()
+        return self.done
+
+    def finish(self):
+        """Run the search to the end and return its result."""
+        while not self.advance():
+            pass
+        return self.result
+
+    def close(self):
+        """Stop listening for barrier changes."""
+        self.environment.barrier_listeners.discard(self)
+
+
+def reconstruct_path(store, goal):
+    """Follow predecessor links back from the goal cell and return the path as (x, y) tuples."""
+    parents = store.parents
+    rows = store.rows
+    path = []
+    cell = goal
+    while cell != -1:
+        path.append(divmod(cell, rows))
+        cell = parents[cell]
+    path.reverse()
+    return path
+
+
+def distances_to(environment, store, start, targets, limit=None, blocked=()):
+    """
+    Run one uniform-cost expansion from start and return {target: cost} for every
+    reachable target, or only the `limit` closest ones. Steps all cost 1, so the
+    open set is a FIFO queue. Cell ids in `blocked` are treated as barriers.
+    """
+    search = store.begin()
+    g_scores, stamps = store.g_scores, store.stamps
+    for cell in blocked:
+        stamps[cell] = search  # Marked as reached, so the expansion never enters it
+    neighbor_cells = environment.neighbor_cells
+    remaining = {store.cell_id(target): target for target in targets}
+    distances = {}
+    wanted = len(remaining) if limit is None else min(limit, len(remaining))
+    start = store.cell_id(start)
+    g_scores[start] = 0
+    stamps[start] = search
+    queue = deque([start])
+
+    while queue and len(distances) < wanted:
+        current = queue.popleft()
+        cost = g_scores[current]
+        if current in remaining:
+            distances[remaining.pop(current)] = cost
+        for neighbor in neighbor_cells(current):
+            if stamps[neighbor] != search:
+                g_scores[neighbor] = cost + 1
+                stamps[neighbor] = search
+                queue.append(neighbor)
+    return distances
+
+
+def bidirectional_search(environment, forward, backward, start, goal, heuristic=False, record=None):
+    """
+    Point-to-point search that grows one frontier from the start and one from the goal,
+    always expanding the smaller one. Every time a frontier reaches a cell the other has
+    labelled, the path through it is a candidate; the search stops once the two frontier
+    minimums together cannot beat the best candidate, so the path is optimal.
+
+    Steps cost 1. Without a heuristic both sides are uniform-cost searches. With one,
+    both are A* searches on balanced Manhattan potentials: (to goal - from start) / 2
+    forward and its negation backward. Keys are doubled to stay integers. As the two
+    potentials cancel out on any full path, the same stopping rule stays exact.
+
+    `forward` and `backward` are NodeStores. `record` receives the counters of the
+    search like an agent's record_search. Returns (path, cost), or (None, inf) if the
+    goal cannot be reached.
+    """
+    started = time.perf_counter()
+    rows = forward.rows
+    (sx, sy), (gx, gy) = start, goal
+    reachable = environment.is_within_bounds(gx, gy) and not environment.is_barrier(gx, gy)
+    neighbor_cells = environment.neighbor_cells
+
+    def potential(cell):
+        if not heuristic:
+            return 0
+        x, y = divmod(cell, rows)
+        return abs(x - gx) + abs(y - gy) - abs(x - sx) - abs(y - sy)
+
+    forward_search, backward_search = forward.begin(), backward.begin()
+    start_cell, goal_cell = forward.cell_id(start), backward.cell_id(goal)
+    forward.g_scores[start_cell], forward.parents[start_cell] = 0, -1
+    forward.stamps[start_cell] = forward_search
+    backward.g_scores[goal_cell], backward.parents[goal_cell] = 0, -1
+    backward.stamps[goal_cell] = backward_search
+    forward_open = [(potential(start_cell), 0, start_cell)]  # (key, cost, cell)
+    backward_open = [(-potential(goal_cell), 0, goal_cell)] if reachable else []
+    best, meeting = (0, start_cell) if reachable and start_cell == goal_cell else (float('inf'), -1)
+    nodes_expanded, heap_pushes, peak_open = 0, len(forward_open) + len(backward_open), 0
+
+    while forward_open and backward_open:
+        if forward_open[0][0] + backward_open[0][0] >= 2 * best:
+            break  # No path through an unexpanded cell can be shorter than the best meeting
+        if len(forward_open) <= len(backward_open):
+            open_set, store, search, other, other_search, sign = (
+                forward_open, forward, forward_search, backward, backward_search, 1)
+        else:
+            open_set, store, search, other, other_search, sign = (
+                backward_open, backward, backward_search, forward, forward_search, -1)
+        _, cost, current = heapq.heappop(open_set)
+        if cost > store.g_scores[current]:
+            continue  # Stale entry, the cell was reached more cheaply since
+        nodes_expanded += 1
+        cost += 1
+        for neighbor in neighbor_cells(current):
+            if store.stamps[neighbor] != search or cost < store.g_scores[neighbor]:
+                store.g_scores[neighbor] = cost
+                store.parents[neighbor] = current
+                store.stamps[neighbor] = search
+                heapq.heappush(open_set, (2 * cost + sign * potential(neighbor), cost, neighbor))
+                heap_pushes += 1
+                if other.stamps[neighbor] == other_search and cost + other.g_scores[neighbor] < best:
+                    best, meeting = cost + other.g_scores[neighbor], neighbor
+        if len(forward_open) + len(backward_open) > peak_open:
+            peak_open = len(forward_open) + len(backward_open)
+
+    if record:
+        heap_pops = heap_pushes - len(forward_open) - len(backward_open)
+        record(1, meeting != -1, nodes_expanded, heap_pushes, heap_pops, peak_open, time.perf_counter() - started)
+    if meeting == -1:
+        return None, float('inf')
+    path = reconstruct_path(forward, meeting)
+    cell = backward.parents[meeting]
+    while cell != -1:
+        path.append(divmod(cell, rows))
+        cell = backward.parents[cell]
+    return path, best
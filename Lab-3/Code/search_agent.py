@@ -0,0 +1,296 @@
+# search_agent.py
+import abc
+import pygame
+import time
+from incremental import IncrementalPlanner
+from routing import RoutePlanner, next_route_leg
+from search import NodeStore, SearchStats, SearchTask, bidirectional_search
+
+
+class SearchAgent(pygame.sprite.Sprite, abc.ABC):
+    """
+    Movement, planning and search plumbing shared by the Lab-3 agents: sliced nearest-task
+    searches, the path cache, route legs, D* Lite repairs, bidirectional point-to-point
+    queries and search profiling. Subclasses provide search_nearest and keep the cost of
+    the task being approached through the begin_task, charge_detour and task_cost hooks.
+    """
+
+    bidirectional_heuristic = False  # Whether find_path_between runs A* instead of UCS
+    no_path_cost = float('inf')  # Cost returned with a None path
+
+    def __init__(self, environment, grid_size):
+        super().__init__()
+        self.image = pygame.Surface((grid_size, grid_size))
+        self.image.fill((0, 0, 255))  # Agent color is blue
+        self.rect = self.image.get_rect()
+        self.grid_size = grid_size
+        self.environment = environment
+        self.position = [0, 0]  # Starting at the top-left corner of the grid
+        self.rect.topleft = (0, 0)
+        self.task_completed = 0
+        self.completed_tasks = []
+        self.path = []  # List of positions to follow
+        self.moving = False  # Flag to indicate if the agent is moving
+        self.total_path_cost = 0  # Store the total path cost
+        self.completed_tasks_with_costs = []  # Store completed tasks with their costs
+        self.node_store = NodeStore(environment.columns, environment.rows)  # Reused search state
+        self.search_stats = SearchStats()  # Nodes expanded and heap pushes over all searches
+        self.route = None  # Planned task order, or None to always head for the nearest task
+        self.incremental = False  # Repair the path with D* Lite when barriers change mid-run
+        self.incremental_planner = None  # Planner for the task currently being approached
+        self.planning = None  # SearchTask for the nearest task while planning a slice per frame
+        self.planning_key = None  # Path cache key the planning result is stored under
+        self.planning_budget = None  # Expansions per slice of that search
+        self.planning_mark = None  # Profiler mark and compute time of the nearest-task query being planned
+        self.planning_time = 0.0
+        self.profiler = None  # SearchProfiler recording every search and nearest-task query, if set
+        self.bidirectional = False  # Answer find_path_to by searching from both ends
+        self.reverse_store = None  # Search state of the backward frontier, created on first use
+
+    def reset(self):
+        """Put the agent back on the start cell with no progress, path or plan."""
+        self.stop_incremental_plan()
+        self.cancel_planning()
+        self.position = [0, 0]
+        self.rect.topleft = (0, 0)
+        self.task_completed = 0
+        self.completed_tasks = []
+        self.completed_tasks_with_costs = []
+        self.total_path_cost = 0
+        self.path = []
+        self.route = None
+        self.moving = False
+
+    @abc.abstractmethod
+    def begin_task(self, path, cost):
+        """Start charging for a new path to a task; cost is what search_nearest returned for it."""
+
+    @abc.abstractmethod
+    def charge_detour(self, steps):
+        """Add steps (negative for a shortcut) to the cost of the task being approached."""
+
+    @abc.abstractmethod
+    def task_cost(self):
+        """Cost to credit the task being approached when it is reached."""
+
+    def route_leg_cost(self, path):
+        """Cost of a route leg, in the same units search_nearest returns."""
+        return len(path) - 1  # Every step costs 1
+
+    def move(self):
+        """Move the agent along the path."""
+        if self.incremental_planner and self.incremental_planner.pending:
+            self.replan()
+        if self.path:
+            next_position = self.path.pop(0)
+            self.position = list(next_position)
+            self.rect.topleft = (self.position[0] * self.grid_size, self.position[1] * self.grid_size)
+            self.check_task_completion()
+        else:
+            self.moving = False  # Stop moving when path is exhausted
+
+    def check_task_completion(self):
+        """Check if the agent has reached a task location."""
+        position_tuple = tuple(self.position)
+        if position_tuple in self.environment.task_locations:
+            task_number = self.environment.task_locations.pop(position_tuple)
+            if self.incremental_planner and self.environment.cell_id(position_tuple) == self.incremental_planner.goal:
+                self.stop_incremental_plan()  # Its task is done, so later barrier changes need no repair
+            self.task_completed += 1
+            self.completed_tasks.append(task_number)
+
+            path_cost = self.task_cost()
+            self.completed_tasks_with_costs.append((task_number, path_cost))
+            self.total_path_cost += path_cost  # Add this task's cost to the total path cost
+
+    def replan(self):
+        """Repair the current path with the incremental planner after barriers changed."""
+        planner = self.incremental_planner
+        start_time = time.perf_counter()
+        path, _ = planner.plan(tuple(self.position))
+        self.record_search(
+            1, path is not None, planner.nodes_expanded, planner.heap_pushes, planner.heap_pops,
+            planner.peak_open, time.perf_counter() - start_time,
+        )
+        if path is None:
+            self.path = []  # The task was walled off; stop and pick another one
+            self.stop_incremental_plan()
+            return
+        # Like a route leg, the repaired path ends at the first task it passes over
+        tasks = self.environment.task_locations
+        index = next((index for index, position in enumerate(path[1:], 1) if position in tasks), len(path) - 1)
+        self.charge_detour(index - len(self.path))  # Charge the detour to the task now being approached
+        self.path = path[1:index + 1]  # Exclude the current position
+        if self.environment.cell_id(path[index]) != planner.goal:
+            self.start_incremental_plan(path[index])  # Repair any later change towards the task reached first
+
+    def start_incremental_plan(self, goal):
+        """
+        Create the incremental planner for the task being approached. It only starts
+        listening here: its first search runs on the first barrier change, so adopting
+        a path never adds a full search to the frame.
+        """
+        self.stop_incremental_plan()
+        self.incremental_planner = IncrementalPlanner(self.environment, goal)
+
+    def stop_incremental_plan(self):
+        """Drop the incremental planner once its task is reached or abandoned."""
+        if self.incremental_planner:
+            self.incremental_planner.close()
+            self.incremental_planner = None
+
+    def plan_route(self, planner=None):
+        """Order the remaining tasks as a tour before moving; find_nearest_task then follows it."""
+        planner = planner or RoutePlanner.for_environment(self.environment)
+        self.route = planner.plan(tuple(self.position))
+
+    def find_nearest_task(self):
+        """Find the nearest task based on the shortest path length using a single search expansion."""
+        mark, start_time = self.profiler.mark() if self.profiler else None, time.perf_counter()
+        path = None
+        if self.route:
+            path = next_route_leg(self.route, self.environment, self.find_path_to)
+            if path:
+                cost = self.route_leg_cost(path)
+        if not path:
+            path, cost = self.find_path_to_nearest(self.environment.task_locations.keys())
+        if path:
+            self.follow_path(path, cost)
+        if self.profiler:
+            self.profiler.record_query(
+                type(self).__name__, mark, len(self.environment.task_locations), path, time.perf_counter() - start_time
+            )
+
+    def follow_path(self, path, cost):
+        """Start moving along a path to a task."""
+        self.begin_task(path, cost)
+        self.path = path[1:]  # Exclude the current position
+        self.moving = True
+        if self.incremental:
+            self.start_incremental_plan(path[-1])
+
+    def start_planning(self, budget):
+        """
+        Begin finding the nearest task without blocking: continue_planning then runs
+        `budget` expansions per call. A planned route is followed leg by leg as before.
+        """
+        self.planning_mark = self.profiler.mark() if self.profiler else None
+        self.planning_time = 0.0
+        self.begin_planning(budget)
+
+    def begin_planning(self, budget):
+        """Answer the nearest-task query from the path cache, or start a sliced search for it."""
+        start_time = time.perf_counter()
+        self.cancel_planning()
+        if self.route:
+            self.find_nearest_task()
+            return
+        self.planning_budget = budget
+        targets = tuple(self.environment.task_locations)
+        self.planning_key = self.cache_key(targets)
+        cached = self.environment.path_cache.get(self.planning_key)
+        self.planning_time += time.perf_counter() - start_time
+        if cached is not None:
+            self.finish_planning(cached)
+            return
+        self.planning = SearchTask(self.environment, self.search_nearest(targets, budget))
+
+    def continue_planning(self):
+        """Run one slice of the pending search and follow its path once it is found."""
+        if self.planning.stale:
+            self.begin_planning(self.planning_budget)  # Barriers changed mid-search, start over
+            if not self.planning:
+                return  # Answered from the path cache
+        start_time = time.perf_counter()
+        done = self.planning.advance()
+        self.planning_time += time.perf_counter() - start_time
+        if done:
+            result = self.planning.result
+            self.environment.path_cache.put(self.planning_key, result)
+            self.planning = None
+            self.finish_planning(result)
+
+    def finish_planning(self, result):
+        """Follow the path a planning search or the path cache found, and profile the query."""
+        path, cost = result
+        if self.profiler:
+            self.profiler.record_query(
+                type(self).__name__, self.planning_mark, len(self.environment.task_locations), path, self.planning_time
+            )
+        if path:
+            self.follow_path(list(path), cost)
+
+    def cancel_planning(self):
+        """Drop an unfinished search."""
+        if self.planning:
+            self.planning.close()
+            self.planning = None
+
+    def find_path_to_nearest(self, targets):
+        """
+        Expand outward once from the agent and return the path to the closest target.
+        Targets at the same cost are resolved in the iteration order of `targets`,
+        which gives the same result as calling find_path_to for every target in turn.
+        Repeated searches are answered from the environment's path cache.
+        """
+        targets = tuple(targets)
+        key = self.cache_key(targets)
+        cached = self.environment.path_cache.get(key)
+        if cached is None:
+            cached = SearchTask(self.environment, self.search_nearest(targets)).finish()
+            self.environment.path_cache.put(key, cached)
+        path, cost = cached
+        return (list(path) if path else None), cost  # A copy, so callers cannot alter the cached path
+
+    def cache_key(self, targets):
+        """Path cache key of a search from the current position for the given targets, in order."""
+        return (type(self).__name__, tuple(self.position), tuple(targets), self.environment.barrier_version)
+
+    @abc.abstractmethod
+    def search_nearest(self, targets, slice_size=None):
+        """
+        Generator behind find_path_to_nearest. With a slice_size it pauses after every
+        slice_size expansions, yielding the count so far; it returns (path, cost).
+        """
+
+    def record_search(self, targets, found, nodes_expanded, heap_pushes, heap_pops, peak_open, wall_time):
+        """Add a finished search to the running totals, and to the profiler if one is attached."""
+        self.search_stats.record(nodes_expanded, heap_pushes)
+        if self.profiler:
+            self.profiler.record_search(
+                type(self).__name__, targets, found, nodes_expanded, heap_pushes, heap_pops, peak_open, wall_time
+            )
+
+    def find_path_to(self, target):
+        """Find a path to the target position with the agent's search."""
+        if self.bidirectional:
+            return self.find_path_between(target)
+        return self.find_path_to_nearest([target])
+
+    def find_path_between(self, target):
+        """
+        Bidirectional search from the agent to a single target. The path has the same cost
+        as find_path_to_nearest([target]) finds, though it may take another route of that cost.
+        """
+        key = ("bidirectional",) + self.cache_key([tuple(target)])
+        cached = self.environment.path_cache.get(key)
+        if cached is None:
+            if self.reverse_store is None:
+                self.reverse_store = NodeStore(self.environment.columns, self.environment.rows)
+            cached = bidirectional_search(
+                self.environment, self.node_store, self.reverse_store, tuple(self.position), tuple(target),
+                heuristic=self.bidirectional_heuristic, record=self.record_search,
+            )
+            self.environment.path_cache.put(key, cached)
+        path, cost = cached
+        return (list(path), cost) if path else (None, self.no_path_cost)  # A copy, so callers cannot alter the cached path
+
+    def get_neighbors(self, x, y):
+        """Get walkable neighboring positions."""
+        neighbors = []
+        directions = [("up", (0, -1)), ("down", (0, 1)), ("left", (-1, 0)), ("right", (1, 0))]
+        for _, (dx, dy) in directions:
+            nx, ny = x + dx, y + dy
+            if self.environment.is_within_bounds(nx, ny) and not self.environment.is_barrier(nx, ny):
+                neighbors.append((nx, ny))
+        return neighbors
@@ -0,0 +1,123 @@
+# test_agents.py
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # The agents build pygame surfaces, but nothing is displayed
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import random
+
+import numpy as np
+import pytest
+
+from agent1 import Agent1
+from agent2 import Agent2
+from agent3 import Agent3
+from environment import Environment
+
+
+def random_environment(seed, columns=30, rows=20, num_tasks=8, num_barriers=180):
+    random.seed(seed)
+    return Environment(columns, rows, 1, num_tasks, num_barriers)
+
+
+def free_cells(environment):
+    return [(x, y) for x in range(environment.columns) for y in range(environment.rows)
+            if not environment.is_barrier(x, y)]
+
+
+def assert_walkable(environment, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (x1, y1), (x2, y2) in zip(path, path[1:]):
+        assert abs(x1 - x2) + abs(y1 - y2) == 1
+        assert not environment.is_barrier(x2, y2)
+
+
+@pytest.mark.parametrize("agent_class", [Agent1, Agent2, Agent3])
+def test_replan_through_another_task_charges_steps_walked(agent_class):
+    # Task 1 is straight down from the start; walling off (0, 2) and (0, 3) after the
+    # first step forces the repaired path over task 2 at (1, 4).
+    environment = Environment.from_arrays(np.zeros((3, 6), dtype=np.uint8), {(0, 4): 1, (1, 4): 2})
+    agent = agent_class(environment, 1)
+    agent.incremental = True
+    agent.find_nearest_task()
+    agent.move()
+    environment.barrier_locations.update([(0, 2), (0, 3)])
+
+    steps = 1
+    while environment.task_locations:
+        if not agent.moving:
+            agent.find_nearest_task()
+            assert agent.moving
+        while agent.moving:
+            position = tuple(agent.position)
+            agent.move()
+            steps += tuple(agent.position) != position
+
+    assert agent.completed_tasks_with_costs == [(2, 5), (1, 1)]
+    assert agent.total_path_cost == steps == 6
+
+
+@pytest.mark.parametrize("agent_class", [Agent1, Agent2, Agent3])
+@pytest.mark.parametrize("seed", range(5))
+def test_bidirectional_find_path_to_matches_agent2_cost(agent_class, seed):
+    environment = random_environment(seed)
+    agent, reference = agent_class(environment, 1), Agent2(environment, 1)
+    agent.bidirectional = True
+    cells = free_cells(environment)
+    rng = random.Random(seed)
+    for _ in range(30):
+        start, goal = rng.choice(cells), rng.choice(cells)
+        agent.position = reference.position = list(start)
+        path, cost = agent.find_path_to(goal)
+        expected_path, expected_cost = reference.find_path_to(goal)
+        assert (path is None) == (expected_path is None)
+        if path is not None:
+            assert cost == len(path) - 1 == expected_cost
+            assert_walkable(environment, path, start, goal)
+
+
+def assert_same_choices(environment, agent, reference, rng, cells):
+    """Agent and reference pick the same nearest task at the same cost, and find equally short paths."""
+    for start in rng.sample(cells, 10):
+        agent.position, reference.position = list(start), list(start)
+        agent.find_nearest_task()
+        reference.find_nearest_task()
+        assert agent.moving == reference.moving
+        if reference.moving:
+            assert agent.path[-1] == reference.path[-1]
+            assert agent.current_task_cost == reference.current_task_cost == len(agent.path)
+        goal = rng.choice(cells)
+        path, cost = agent.find_path_to(goal)
+        expected_path, expected_cost = reference.find_path_to(goal)
+        assert cost == expected_cost
+        if path is not None:
+            assert_walkable(environment, path, start, goal)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_jump_point_search_matches_agent2(seed):
+    environment = random_environment(seed)
+    agent, reference = Agent3(environment, 1), Agent2(environment, 1)
+    rng = random.Random(seed)
+    assert_same_choices(environment, agent, reference, rng, free_cells(environment))
+
+    # Toggle barriers so the jump tables have to be rebuilt before the next search
+    tasks = set(environment.task_locations)
+    cells = [(x, y) for x in range(environment.columns) for y in range(environment.rows) if (x, y) not in tasks]
+    environment.barrier_locations.symmetric_difference_update(rng.sample(cells, 40))
+    assert_same_choices(environment, agent, reference, rng, free_cells(environment))
+
+
+@pytest.mark.parametrize("agent_class", [Agent1, Agent2, Agent3])
+def test_reaching_the_goal_stops_the_incremental_planner(agent_class):
+    environment = Environment.from_arrays(np.zeros((3, 6), dtype=np.uint8), {(0, 2): 1, (2, 5): 2})
+    agent = agent_class(environment, 1)
+    agent.incremental = True
+    agent.find_nearest_task()
+    while agent.path:
+        agent.move()
+    assert agent.incremental_planner is None
+
+    searches = agent.search_stats.searches
+    environment.barrier_locations.add((1, 1))
+    agent.move()  # Nothing left to repair, so no replan
+    assert agent.search_stats.searches == searches
@@ -0,0 +1,63 @@
+# timestep.py
+"""
+Fixed-timestep clock that separates simulation steps from rendered frames.
+
+Modes:
+    realtime  one step every step_time seconds of wall time, frames limited to fps
+    turbo     turbo_steps steps every frame, frames still limited to fps
+    headless  no frames at all: every tick returns a batch of steps at once, without waiting
+
+In every mode only every render_every-th frame needs drawing.
+"""
+import time
+
+import pygame
+
+MODES = ("realtime", "turbo", "headless")
+
+
+class SimulationClock:
+    def __init__(self, step_time, mode="realtime", turbo_steps=20, render_every=1, fps=60, max_catch_up=5):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.step_time = step_time  # Seconds of wall time per step in realtime mode
+        self.mode = mode
+        self.turbo_steps = turbo_steps  # Steps per frame in turbo mode, and per tick when headless
+        self.render_every = max(1, render_every)
+        self.fps = fps
+        self.max_catch_up = max_catch_up  # Most steps one realtime frame runs after a stall
+        self.frame_clock = pygame.time.Clock() if mode != "headless" else None
+        self.frames = 0
+        self.steps = 0  # Steps handed out so far
+        self.owed = 0.0  # Realtime seconds not yet turned into steps
+        self.last_time = time.perf_counter()
+
+    @property
+    def headless(self):
+        return self.mode == "headless"
+
+    def tick(self):
+        """Wait for the next frame (except when headless) and return how many steps to run in it."""
+        if self.frame_clock:
+            self.frame_clock.tick(self.fps)
+        self.frames += 1
+        if self.mode == "realtime":
+            now = time.perf_counter()
+            self.owed += now - self.last_time
+            self.last_time = now
+            steps = min(int(self.owed // self.step_time), self.max_catch_up)
+            # Time beyond the catch-up limit is dropped, so a stall does not cause a burst of steps
+            self.owed = min(self.owed - steps * self.step_time, self.step_time)
+        else:
+            steps = self.turbo_steps
+        self.steps += steps
+        return steps
+
+    def hold(self):
+        """Forget the time owed so far, for when the simulation waits on something else (a plan)."""
+        self.owed = 0.0
+        self.last_time = time.perf_counter()
+
+    def render_due(self):
+        """Whether the current frame should be drawn."""
+        return not self.headless and self.frames % self.render_every == 0
@@ -1,51 +1,119 @@
-import numpy as np
-
-class Agent:
-    def __init__(self, id, availability, preferences):
-        """
-        Initialize the agent with an id, availability, preferences, and schedule.
-        """
-        self.id = id  # Unique identifier for each student
-        self.availability = availability  # Availability matrix (0 = unavailable, 1 = available)
-        self.preferences = preferences  # Preference for each slot (1-5 scale)
-        self.schedule = []  # The schedule this agent (student) will follow
-
-    def assign_classes(self, class_assignments):
-        """
-        Assign classes to this agent (student) based on availability and preferences.
-        """
-        self.schedule = []  # Reset schedule before assigning
-        for class_id, (student, slot) in enumerate(class_assignments):
-            if student == self.id and self.availability[slot] == 1:
-                # Assign the class to the student if the student is available
-                self.schedule.append((class_id, slot))
-
-    def reset_schedule(self):
-        """
-        Clear the current schedule for the agent (student) to allow re-scheduling.
-        """
-        self.schedule = []  # Clear all classes from the student's schedule
-
-    def get_fitness(self, environment):
-        """
-        Calculate the fitness score of the current schedule.
-        Fitness is calculated based on:
-        1. Conflict Minimization: Penalize if a class is scheduled in an unavailable time slot.
-        2. Preference Alignment: Reward schedules aligning with the student's preferred time slots.
-        """
-        conflict_penalty = 0
-        preference_penalty = 0
-
-        for class_id, slot in self.schedule:
-            # Penalize for conflicts
-            if self.availability[slot] == 0:
-                conflict_penalty += 1
-
-            # Penalize based on preference alignment
-            if self.preferences[slot] > 0:
-                preference_penalty += 1 / self.preferences[slot]
-            else:
-                preference_penalty += 1  # Maximum penalty for missing preference data
-
-        # Total fitness score is the sum of conflict and preference penalties
+import numpy as np
+
+
+class ScheduleIndex:
+    """
+    Every student's schedule at once, as an inverted student -> classes index built in
+    one pass. The classes of student s are class_ids[offsets[s]:offsets[s + 1]], in
+    class order, held in the matching slots; like Agent.assign_classes, a class is only
+    scheduled if its student is available in its slot.
+    """
+
+    def __init__(self, environment, class_assignments):
+        assignments = np.asarray(class_assignments).reshape(-1, 2)  # (student, slot) per class
+        students, slots = assignments[:, 0], assignments[:, 1]
+        available = (environment.availability_masks[students] >> slots.astype(np.uint32) & 1) == 1
+        class_ids = np.flatnonzero(available)
+
+        # Group the scheduled classes by student; the stable sort keeps each student's in class order
+        order = np.argsort(students[class_ids], kind="stable")
+        self.environment = environment
+        self.class_ids = class_ids[order]
+        self.students = students[self.class_ids]
+        self.slots = slots[self.class_ids]
+        self.offsets = np.zeros(environment.num_students + 1, np.intp)
+        np.cumsum(np.bincount(self.students, minlength=environment.num_students), out=self.offsets[1:])
+        self._fitness = None
+
+    def schedule(self, student):
+        """The (class_id, slot) pairs of one student, like Agent.schedule."""
+        start, stop = self.offsets[student], self.offsets[student + 1]
+        return list(zip(self.class_ids[start:stop].tolist(), self.slots[start:stop].tolist()))
+
+    def fitness(self):
+        """
+        Every student's schedule fitness, as Agent.get_fitness computes it, in one pass.
+        bincount adds each student's terms in class order, so the results match bit for bit.
+        """
+        if self._fitness is None:
+            count = self.environment.num_students
+            preferences = self.environment.student_preferences[self.students, self.slots]
+            penalties = np.where(preferences > 0, 1 / np.maximum(preferences, 1), 1)
+            unavailable = (self.environment.availability_masks[self.students] >> self.slots.astype(np.uint32) & 1) == 0
+            conflicts = np.bincount(self.students, unavailable, minlength=count)
+            self._fitness = conflicts + np.bincount(self.students, penalties, minlength=count)
+        return self._fitness
+
+    def agents(self):
+        """An Agent per student, each a view of its schedule in this index."""
+        availabilities = self.environment.student_availabilities
+        preferences = self.environment.student_preferences
+        return [Agent(i, availabilities[i], preferences[i], self) for i in range(self.environment.num_students)]
+
+
+class Agent:
+    def __init__(self, id, availability, preferences, index=None):
+        """
+        Initialize the agent with an id, availability, preferences, and schedule.
+        With a ScheduleIndex, the schedule and fitness are read from the index until
+        classes are assigned to this agent alone.
+        """
+        self.id = id  # Unique identifier for each student
+        self.availability = availability  # Availability matrix (0 = unavailable, 1 = available)
+        self.preferences = preferences  # Preference for each slot (1-5 scale)
+        self.index = index
+        self._schedule = []  # The schedule this agent (student) will follow, without an index
+
+    @property
+    def schedule(self):
+        if self.index is not None:
+            return self.index.schedule(self.id)
+        return self._schedule
+
+    @schedule.setter
+    def schedule(self, schedule):
+        self.index = None  # The agent now owns its schedule
+        self._schedule = schedule
+
+    def assign_classes(self, class_assignments):
+        """
+        Assign classes to this agent (student) based on availability and preferences.
+        """
+        self.schedule = []  # Reset schedule before assigning
+        for class_id, (student, slot) in enumerate(class_assignments):
+            if student == self.id and self.availability[slot] == 1:
+                # Assign the class to the student if the student is available
+                self.schedule.append((class_id, slot))
+
+    def reset_schedule(self):
+        """
+        Clear the current schedule for the agent (student) to allow re-scheduling.
+        """
+        self.schedule = []  # Clear all classes from the student's schedule
+
+    def get_fitness(self, environment):
+        """
+        Calculate the fitness score of the current schedule.
+        Fitness is calculated based on:
+        1. Conflict Minimization: Penalize if a class is scheduled in an unavailable time slot.
+        2. Preference Alignment: Reward schedules aligning with the student's preferred time slots.
+        """
+        if self.index is not None:
+            return self.index.fitness()[self.id]
+
+        conflict_penalty = 0
+        preference_penalty = 0
+
+        for class_id, slot in self.schedule:
+            # Penalize for conflicts
+            if self.availability[slot] == 0:
+                conflict_penalty += 1
+
+            # Penalize based on preference alignment
+            if self.preferences[slot] > 0:
+                preference_penalty += 1 / self.preferences[slot]
+            else:
+                preference_penalty += 1  # Maximum penalty for missing preference data
+
+        # Total fitness score is the sum of conflict and preference penalties
         return conflict_penalty + preference_penalty
\ No newline at end of file
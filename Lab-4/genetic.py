@@ -0,0 +1,231 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from environment import SLOTS
+
+CHUNK_SIZE = 1 << 20  # Genes scored at a time, so large populations never build huge temporary arrays
+PREFERENCE_PENALTIES = 1 / np.maximum(1, np.arange(256))  # 1 / max(1, preference) of every uint8 preference
+POPCOUNTS = np.array([bin(byte).count("1") for byte in range(256)], np.uint8)  # Set bits of every byte
+
+
+def popcount(masks):
+    """Number of set bits of every uint32 mask, looked up a byte at a time."""
+    masks = np.ascontiguousarray(masks, np.uint32)
+    return POPCOUNTS[masks.view(np.uint8)].reshape(masks.shape + (4,)).sum(axis=-1, dtype=np.int64)
+
+
+def population_fitness(environment, population, durations=False):
+    """
+    Calculate the fitness of every individual of a population at once.
+    The population is a 2-D array (individuals x classes) of assigned students, and the
+    result matches the per-individual fitness in run.py exactly:
+    1. Conflict Minimization: 1 for every class whose student is unavailable in its slot.
+    2. Preference Alignment: 1 / max(1, preference) of the student for that slot.
+    With durations=True, conflicts instead count every hour of a class its student is
+    unavailable for, plus every hour a student is booked for more than one class.
+    """
+    population = np.asarray(population)
+    count, num_classes = population.shape
+    scores = np.zeros(count)
+    if not num_classes:
+        return scores
+
+    masks = environment.availability_masks
+    preferences = environment.student_preferences
+    slots = np.arange(num_classes) % SLOTS
+    shifts = slots.astype(np.uint32)
+    class_masks = environment.class_masks() if durations else None
+
+    step = max(1, CHUNK_SIZE // num_classes)
+    for start in range(0, count, step):
+        students = population[start:start + step]
+        if durations:
+            conflicts = popcount(class_masks & ~masks[students]).sum(axis=1)
+            conflicts += double_bookings(students, class_masks, environment.num_students)
+        else:
+            conflicts = np.count_nonzero((masks[students] >> shifts & 1) == 0, axis=1)
+        # cumsum adds the penalties left to right like the scalar loop, so the last column
+        # equals its total bit for bit (np.sum would add them pairwise and round differently)
+        preference = np.cumsum(PREFERENCE_PENALTIES[preferences[students, slots]], axis=1)[:, -1]
+        scores[start:start + step] = conflicts + preference
+    return scores
+
+
+def double_bookings(population, class_masks, num_students):
+    """
+    Hours every individual books a student for more than one class. The classes of each
+    (individual, student) pair are OR-ed together: every booked hour the union is
+    missing is an hour booked twice.
+    """
+    count, num_classes = population.shape
+    keys = (population + np.arange(count)[:, np.newaxis] * num_students).ravel()
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))  # First gene of every (individual, student) pair
+    unions = np.bitwise_or.reduceat(np.tile(class_masks, count)[order], starts)
+    booked = np.bincount(keys[starts] // num_students, popcount(unions), minlength=count)
+    return popcount(class_masks).sum() - booked.astype(np.int64)
+
+
+class Breeder:
+    """
+    Breeds whole generations at once on two preallocated (population x classes) buffers:
+    each generation is written into the buffer the one before last used, so breeding
+    allocates no new population-sized arrays.
+
+    1. Selection: the fitter half are the parents (top-k by argpartition, not a full sort).
+    2. Crossover: every child joins two distinct random parents at a random point.
+    3. Mutation: every gene is reassigned to a random student with probability mutation_rate.
+    """
+
+    def __init__(self, population, num_students, mutation_rate, rng=None):
+        population = np.asarray(population)
+        size, num_classes = population.shape
+        self.num_students = num_students
+        self.mutation_rate = mutation_rate
+        self.rng = np.random.default_rng(rng)  # A seed or an existing Generator
+        self.buffers = [population.copy(), np.empty_like(population)]
+
+        # Scratch space reused every generation
+        self.second_parents = np.empty_like(population)
+        self.mask = np.empty(population.shape, bool)
+        self.noise = np.empty(population.shape)
+        self.draws = np.empty(size)
+        self.first, self.second, self.points = (np.empty(size, np.intp) for _ in range(3))
+        self.columns = np.arange(num_classes)
+
+    @property
+    def population(self):
+        """The current generation. Breeding overwrites it two generations later, so copy rows to keep them."""
+        return self.buffers[0]
+
+    def load(self, population):
+        """Replace the current generation."""
+        self.buffers[0][...] = population
+
+    def random_below(self, limit, out):
+        """Fill `out` with random integers in [0, limit), via the reused float draws."""
+        self.rng.random(out=self.draws)
+        self.draws *= limit
+        np.copyto(out, self.draws, casting="unsafe")  # Truncates, so always below the limit
+
+    def breed(self, scores):
+        """Creates the next generation from the current one and its scores, and returns it."""
+        current, following = self.buffers
+        size, num_classes = current.shape
+        half = max(1, size // 2)
+        parents = np.argpartition(scores, half - 1)[:half] if half < size else np.arange(size)
+
+        # Two distinct parents per child (the second is offset from the first by 1 to half-1)
+        self.random_below(half, self.first)
+        self.random_below(half - 1, self.second)
+        self.second += self.first + 1
+        self.second %= half
+        np.take(parents, self.first, out=self.first)
+        np.take(parents, self.second, out=self.second)
+
+        # Single-point crossover: genes before the point come from the first parent
+        self.random_below(num_classes - 1, self.points)
+        self.points += 1
+        np.take(current, self.first, axis=0, out=following)
+        np.take(current, self.second, axis=0, out=self.second_parents)
+        np.greater_equal(self.columns, self.points[:, np.newaxis], out=self.mask)
+        np.copyto(following, self.second_parents, where=self.mask)
+
+        # Mutation: reassign the masked genes to random students
+        self.rng.random(out=self.noise)
+        np.less(self.noise, self.mutation_rate, out=self.mask)
+        self.rng.random(out=self.noise)
+        self.noise *= self.num_students
+        np.copyto(following, self.noise, where=self.mask, casting="unsafe")
+
+        self.buffers.reverse()
+        return following
+
+
+class DeltaFitness:
+    """
+    Fitness as a table of per-(student, slot) terms. The fitness is a sum of one term per
+    class, so the change from reassigning one class is the difference of two table entries.
+    This holds for the default fitness only: with durations, classes of a student interact.
+    """
+
+    def __init__(self, environment):
+        # The same terms population_fitness adds: conflict + 1 / max(1, preference)
+        self.terms = (environment.student_availabilities == 0) + PREFERENCE_PENALTIES[environment.student_preferences]
+        self.best_students = self.terms.argmin(axis=0)  # Student with the lowest term of each slot
+        self.best_terms = self.terms.min(axis=0)
+        self.slots = np.arange(environment.num_classes) % SLOTS
+
+    def delta(self, individual, class_id, student):
+        """Fitness change of assigning class_id of an individual to another student, in O(1)."""
+        slot = class_id % SLOTS
+        return self.terms[student, slot] - self.terms[individual[class_id], slot]
+
+    def refine(self, population, rows, moves):
+        """
+        Steepest-descent local search on the given rows of a population, in place: each of
+        up to `moves` steps reassigns the class whose move to its best student lowers the
+        fitness most. Returns the fitness decrease of every row. The terms are independent,
+        so the steps are the `moves` largest gains, taken at once.
+        """
+        individuals = population[rows]
+        gains = self.terms[individuals, self.slots] - self.best_terms[self.slots]
+        moves = min(moves, gains.shape[1])
+        if moves < 1:
+            return np.zeros(len(individuals))
+        chosen = np.argpartition(gains, -moves, axis=1)[:, -moves:]  # Classes with the largest gains
+        np.put_along_axis(individuals, chosen, self.best_students[self.slots[chosen]], axis=1)
+        population[rows] = individuals
+        return np.take_along_axis(gains, chosen, axis=1).sum(axis=1)
+
+
+class FitnessCache:
+    """
+    Least-recently-used cache of fitness scores keyed on each genome's bytes, so
+    elites and duplicate genomes are scored once instead of every time they are seen.
+    """
+
+    def __init__(self, environment, maxsize=1 << 16, durations=False):
+        self.environment = environment
+        self.durations = durations  # Passed on to population_fitness
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """Fraction of genomes looked up so far that were already scored."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def scores(self, population):
+        """Fitness of every individual, scoring only genomes not in the cache, in one batch."""
+        population = np.ascontiguousarray(population)
+        keys = [genome.tobytes() for genome in population]
+        scores = np.empty(len(keys))
+        missing = {}  # Key -> rows of the population with that uncached genome
+        for row, key in enumerate(keys):
+            score = self.entries.get(key)
+            if score is None:
+                missing.setdefault(key, []).append(row)
+            else:
+                self.entries.move_to_end(key)
+                scores[row] = score
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)  # Repeats of a new genome within the batch count as hits
+        if missing:
+            fresh = population_fitness(
+                self.environment, population[[rows[0] for rows in missing.values()]], self.durations)
+            for (key, rows), score in zip(missing.items(), fresh.tolist()):
+                scores[rows] = score
+                self.entries[key] = score
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return scores
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
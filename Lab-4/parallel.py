@@ -0,0 +1,300 @@
+# parallel.py
+"""
+Run the Lab-4 genetic algorithm across CPU cores.
+
+ParallelFitness scores one large population on a process pool, and IslandModel evolves
+K sub-populations side by side, one per core, exchanging their best schedules every few
+generations. In both, the environment matrices, populations and scores live in shared
+memory: workers attach them once, and a task is only a few names and row numbers, so
+no array is pickled per task.
+
+Processes cost far more to start than a 50 x 8 population costs to score, so this pays
+off on large instances and populations. Scripts using it need an `if __name__ == "__main__"`
+guard, as workers may import the main module.
+
+Example:
+    python parallel.py instances/big.scn --islands 8 --generations 200 --cores 1 2 4 8
+    python parallel.py --classes 2000 --students 5000 --batch 20000 --cores 1 2 4
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from environment import Environment
+from genetic import Breeder, FitnessCache, population_fitness
+from scenario import load_environment
+
+ENVIRONMENT_FIELDS = ("class_durations", "class_priorities", "availability_masks", "student_preferences", "pref")
+MIN_TASK_GENES = 1 << 16  # Fewest genes a fitness task scores, so tasks outweigh their overhead
+
+# Worker state, set up once per process by _init_worker
+_attached = {}  # Shared memory block name -> block, for every block this worker has attached
+_environment = None
+_cache = None  # Fitness cache of this worker, shared by the islands it evolves
+_breeder = None  # Breeding buffers of this worker, loaded with each island in turn
+
+
+class SharedArrays:
+    """Numpy arrays copied into shared memory blocks owned by this process."""
+
+    def __init__(self):
+        self.blocks = []
+
+    def add(self, array):
+        """Copy an array into a new block; returns the shared array and its descriptor for workers."""
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.blocks.append(block)
+        shared = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+        shared[...] = array
+        return shared, (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Free every block. Arrays returned by add() must no longer be referenced."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+
+def attach(descriptor):
+    """The shared array a descriptor refers to, attaching its block once per worker."""
+    name, shape, dtype = descriptor
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype, buffer=_attached[name].buf)
+
+
+def share_environment(shared, environment):
+    """Copy the environment matrices into shared memory; returns their descriptors."""
+    return {field: shared.add(getattr(environment, field))[1] for field in ENVIRONMENT_FIELDS}
+
+
+def _init_worker(descriptors):
+    global _environment, _cache
+    _environment = Environment.from_arrays(**{field: attach(descriptor) for field, descriptor in descriptors.items()})
+    _cache = FitnessCache(_environment)
+
+
+def _ping(_):
+    return os.getpid()
+
+
+def _score_rows(population_descriptor, scores_descriptor, start, stop):
+    """Score rows start:stop of the shared population into the shared scores."""
+    attach(scores_descriptor)[start:stop] = population_fitness(_environment, attach(population_descriptor)[start:stop])
+
+
+def _evolve_island(populations_descriptor, scores_descriptor, island, generations, mutation_rate, seed):
+    """Evolve one island of the shared populations for a number of generations, in place."""
+    global _breeder
+    populations, scores = attach(populations_descriptor), attach(scores_descriptor)
+    if _breeder is None or _breeder.population.shape != populations[island].shape:
+        _breeder = Breeder(populations[island], _environment.num_students, mutation_rate)
+    else:
+        _breeder.load(populations[island])
+    _breeder.mutation_rate = mutation_rate
+    _breeder.rng = np.random.default_rng(seed)
+    population = _breeder.population
+    for _ in range(generations):
+        population = _breeder.breed(_cache.scores(population))
+    populations[island] = population
+    scores[island] = _cache.scores(population)
+
+
+class ParallelFitness:
+    """
+    Scores populations on a pool of worker processes. Each call copies the population
+    into a shared buffer and hands every worker a range of rows to score in place.
+    """
+
+    def __init__(self, environment, workers=None):
+        self.environment = environment
+        self.workers = workers or os.cpu_count()
+        self.shared = SharedArrays()
+        self.executor = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(share_environment(self.shared, environment),),
+        )
+        self.population = self.fitness = None  # Shared buffers, grown to the largest population seen
+
+    def warm_up(self):
+        """Start every worker now rather than on the first call."""
+        list(self.executor.map(_ping, range(self.workers)))
+
+    def scores(self, population):
+        """Fitness of every individual, as population_fitness, split across the workers."""
+        population = np.asarray(population)
+        count = len(population)
+        if self.population is None or count > len(self.population) or population.dtype != self.population.dtype:
+            self.grow(count, population)
+        self.population[:count] = population
+
+        step = max(-(-count // self.workers), MIN_TASK_GENES // max(1, self.environment.num_classes))
+        starts = range(0, count, step)
+        list(self.executor.map(
+            _score_rows, [self.population_descriptor] * len(starts), [self.fitness_descriptor] * len(starts),
+            starts, [min(start + step, count) for start in starts],
+        ))
+        return self.fitness[:count].copy()
+
+    def grow(self, count, population):
+        # Old buffers are left to close(): workers may still hold them attached
+        self.population, self.population_descriptor = self.shared.add(
+            np.empty((max(count, 1), population.shape[1]), population.dtype))
+        self.fitness, self.fitness_descriptor = self.shared.add(np.empty(max(count, 1)))
+
+    def close(self):
+        self.executor.shutdown()
+        self.population = self.fitness = None
+        self.shared.close()
+
+
+class IslandModel:
+    """
+    K sub-populations (islands) evolved on a process pool. Each epoch every island runs
+    migration_interval generations in a worker; then the best `migrants` schedules of each
+    island replace the worst of the next one, in a ring. Island i's generations in epoch e
+    are seeded with (seed, i, e), so results do not depend on the number of workers.
+    """
+
+    def __init__(self, environment, islands=4, population_size=50, mutation_rate=0.1,
+                 migration_interval=10, migrants=2, workers=None, seed=0):
+        self.environment = environment
+        self.islands = islands
+        self.mutation_rate = mutation_rate
+        self.migration_interval = max(1, migration_interval)
+        self.migrants = min(migrants, population_size // 2)  # Best and worst must not overlap
+        self.seed = seed
+        self.generations = 0
+        self.epochs = 0
+
+        self.shared = SharedArrays()
+        initial = np.random.default_rng(seed).integers(
+            0, environment.num_students, size=(islands, population_size, environment.num_classes))
+        self.populations, self.populations_descriptor = self.shared.add(initial)
+        self.scores, self.scores_descriptor = self.shared.add(np.full((islands, population_size), np.inf))
+        self.workers = min(workers or os.cpu_count(), islands)
+        self.executor = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(share_environment(self.shared, environment),),
+        )
+
+    def warm_up(self):
+        """Start every worker now rather than on the first epoch."""
+        list(self.executor.map(_ping, range(self.workers)))
+
+    def evolve(self, generations):
+        """Run every island for `generations` more generations, migrating after each epoch."""
+        while generations > 0:
+            step = min(self.migration_interval, generations)
+            list(self.executor.map(
+                _evolve_island, [self.populations_descriptor] * self.islands, [self.scores_descriptor] * self.islands,
+                range(self.islands), [step] * self.islands, [self.mutation_rate] * self.islands,
+                [(self.seed, island, self.epochs) for island in range(self.islands)],
+            ))
+            self.epochs += 1
+            self.generations += step
+            generations -= step
+            self.migrate()
+
+    def migrate(self):
+        """Ring migration: island i's best schedules replace island i+1's worst."""
+        if self.islands < 2 or self.migrants < 1:
+            return
+        rows = np.arange(self.islands)[:, np.newaxis]
+        order = np.argsort(self.scores, axis=1, kind="stable")
+        best, worst = order[:, :self.migrants], order[:, -self.migrants:]
+        emigrants, emigrant_scores = self.populations[rows, best], self.scores[rows, best]
+        self.populations[rows, worst] = np.roll(emigrants, 1, axis=0)
+        self.scores[rows, worst] = np.roll(emigrant_scores, 1, axis=0)
+
+    def best(self):
+        """The best schedule on any island and its fitness."""
+        island, row = np.unravel_index(np.argmin(self.scores), self.scores.shape)
+        return self.populations[island, row].copy(), float(self.scores[island, row])
+
+    def close(self):
+        self.executor.shutdown()
+        self.populations = self.scores = None
+        self.shared.close()
+
+
+def measure_islands(environment, args, workers):
+    """Island generations per second and best fitness of one island-model run."""
+    model = IslandModel(environment, args.islands, args.population, args.mutation_rate,
+                        args.migration_interval, args.migrants, workers, args.seed)
+    try:
+        model.warm_up()
+        start = time.perf_counter()
+        model.evolve(args.generations)
+        elapsed = time.perf_counter() - start
+        return args.islands * args.generations / elapsed, model.best()[1]
+    finally:
+        model.close()
+
+
+def measure_batch(environment, args, workers):
+    """Individuals scored per second by ParallelFitness on one random population."""
+    population = np.random.default_rng(args.seed).integers(
+        0, environment.num_students, size=(args.batch, environment.num_classes))
+    evaluator = ParallelFitness(environment, workers)
+    try:
+        evaluator.warm_up()
+        start = time.perf_counter()
+        evaluator.scores(population)
+        return args.batch / (time.perf_counter() - start)
+    finally:
+        evaluator.close()
+
+
+def print_scaling(title, unit, rates, cores):
+    """Rates per core count, with speedup and efficiency against the first core count."""
+    print(f"{title} ({os.cpu_count()} CPUs available)")
+    print(f"{'cores':>6} {unit:>16} {'speedup':>8} {'efficiency':>10}")
+    for count, rate in zip(cores, rates):
+        speedup = rate / rates[0]
+        print(f"{count:>6} {rate:>16.1f} {speedup:>8.2f} {speedup * cores[0] / count:>10.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the Lab-4 genetic algorithm across CPU cores.")
+    parser.add_argument("scenario", nargs="?", help="scenario file to load instead of random data (see scenario.py)")
+    parser.add_argument("--classes", type=int, default=200, help="classes of the random instance")
+    parser.add_argument("--students", type=int, default=50, help="students of the random instance")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cores", type=int, nargs="+", default=[1, os.cpu_count()], help="worker counts to compare")
+    parser.add_argument("--islands", type=int, default=4)
+    parser.add_argument("--population", type=int, default=50, help="individuals per island")
+    parser.add_argument("--generations", type=int, default=100, help="generations per island")
+    parser.add_argument("--mutation-rate", type=float, default=0.1)
+    parser.add_argument("--migration-interval", type=int, default=10, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=2, help="schedules each island sends per migration")
+    parser.add_argument("--batch", type=int, default=0, help="also time scoring one population of this size")
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        environment = load_environment(args.scenario)
+    else:
+        np.random.seed(args.seed)
+        environment = Environment(args.classes, args.students)
+    cores = sorted(set(args.cores))
+
+    results = [measure_islands(environment, args, workers) for workers in cores]
+    print_scaling(f"Island model: {args.islands} islands x {args.population} individuals, "
+                  f"{environment.num_classes} classes, {environment.num_students} students",
+                  "generations/s", [rate for rate, _ in results], cores)
+    bests = sorted({best for _, best in results})
+    print(f"Best fitness {bests[0]:.2f}" + ("" if len(bests) == 1 else f" (differs between core counts: {bests})"))
+    if args.batch:
+        print()
+        rates = [measure_batch(environment, args, workers) for workers in cores]
+        print_scaling(f"Fitness of {args.batch} individuals", "individuals/s", rates, cores)
+
+
+if __name__ == "__main__":
+    main()
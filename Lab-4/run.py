@@ -1,151 +1,158 @@
-import pygame
-from agent import Agent
-from environment import Environment
-import numpy as np
-import random
-
-# Initialize Pygame
-pygame.init()
-SCREEN_WIDTH = 1000
-SCREEN_HEIGHT = 800  # Increased height to accommodate updates below the grid
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Class Scheduling Visualization")
-font = pygame.font.Font(None, 24)
-
-# Environment setup
-num_classes = 8
-num_students = 5
-environment = Environment(num_classes, num_students)
-class_assignments = environment.generate_assignments()
-
-# Initialize agents (students)
-agents = [Agent(id=i, availability=environment.student_availabilities[i], preferences=environment.student_preferences[i]) for i in range(num_students)]
-
-# Genetic Algorithm parameters
-population_size = 50
-mutation_rate = 0.1
-n_generations = 100
-generation_delay = 1000  # Delay (milliseconds) between each generation for visualization
-
-# Updates list to display below the grid
-updates = []
-max_updates = 5  # Max number of updates to display at once
-
-# Fitness Function (Conflict Minimization and Preference Alignment)
-def fitness(individual):
-    """Calculate fitness of the schedule by minimizing conflict and preference penalties."""
-    conflict_penalty = 0
-    preference_penalty = 0
-
-    # Check each class assigned in the individual's schedule
-    for class_id, student in enumerate(individual):
-        slot = class_id % 24  # Assume class_id mod 24 is the slot (simplification)
-
-        # Conflict penalty: penalize if student is unavailable at the assigned time
-        if environment.student_availabilities[student, slot] == 0:
-            conflict_penalty += 1
-
-        # Preference penalty: penalize if the time slot is not preferred
-        preference_penalty += 1 / max(1, environment.student_preferences[student, slot])
-
-    # Total fitness is the sum of conflict penalty and preference penalty
-    return conflict_penalty + preference_penalty
-
-# Selection Function (Selecting the top half of the population based on fitness)
-def selection(population):
-    """Selects the top half of the population based on fitness."""
-    return sorted(population, key=fitness)[:population_size // 2]
-
-# Crossover Function (Single-Point Crossover)
-def crossover(parent1, parent2):
-    """Performs single-point crossover to combine two parent schedules."""
-    point = random.randint(1, num_classes - 1)
-    child = np.concatenate([parent1[:point], parent2[point:]])
-    return child
-
-# Mutation Function (Random Assignment Mutation)
-def mutate(individual):
-    """Randomly mutates the class assignments."""
-    for i in range(len(individual)):
-        if random.random() < mutation_rate:
-            individual[i] = random.randint(0, num_students - 1)  # Reassign class to a random student
-    return individual
-
-# Initialize population
-population = environment.generate_assignments()
-
-# Main loop for genetic algorithm and visualization
-running = True
-best_solution = None
-best_fitness = float('inf')
-generation_count = 0
-max_fitness_achieved = float('inf')  # Variable to track the max fitness achieved
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    # Genetic Algorithm Step-by-Step per Generation
-    # Select parents based on fitness
-    selected = selection(population)
-
-    # Crossover and mutation to create next generation
-    next_generation = []
-    while len(next_generation) < population_size:
-        parent1, parent2 = random.sample(selected, 2)
-        child = crossover(parent1, parent2)
-        next_generation.append(mutate(child))
-
-    # Update population with the next generation
-    population = next_generation
-
-    # Find the best solution in the current generation
-    current_best = min(population, key=fitness)
-    current_fitness = fitness(current_best)
-    if current_fitness < best_fitness:
-        best_fitness = current_fitness
-        best_solution = current_best
-
-    # Track max fitness achieved
-    if current_fitness < max_fitness_achieved:
-        max_fitness_achieved = current_fitness
-
-    # Draw current generation's best solution on the grid
-    environment.draw_grid(screen, font, current_best)
-
-    # Display generation and fitness info on the right panel
-    generation_text = font.render(f"Generation: {generation_count + 1}", True, (0, 0, 0))
-    fitness_text = font.render(f"Best Fitness (Current): {best_fitness:.2f}", True, (0, 0, 0))
-    max_fitness_text = font.render(f"Max Fitness Achieved: {max_fitness_achieved:.2f}", True, (0, 0, 0))
-
-    screen.blit(generation_text, (SCREEN_WIDTH - 300, 50))
-    screen.blit(fitness_text, (SCREEN_WIDTH - 300, 80))
-    screen.blit(max_fitness_text, (SCREEN_WIDTH - 300, 110))
-
-    # Add update for the current generation to the updates list
-    update_text = f"Generation {generation_count + 1}: Best Fitness = {best_fitness:.2f}"
-    updates.append(update_text)
-    if len(updates) > max_updates:
-        updates.pop(0)
-
-    # Display the list of updates below the grid
-    update_start_y = 500
-    for i, update in enumerate(updates):
-        update_surface = font.render(update, True, (0, 0, 0))
-        screen.blit(update_surface, (50, update_start_y + i * 25))
-
-    pygame.display.flip()
-    pygame.time.delay(generation_delay)
-
-    generation_count += 1
-    if generation_count >= n_generations:
-        break
-
-# Keep window open after completion
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-pygame.quit()
+import argparse
+import os
+import pygame
+from agent import Agent
+from environment import Environment
+from genetic import Breeder, DeltaFitness, FitnessCache
+from scenario import load_environment
+from timestep import MODES, SimulationClock
+import numpy as np
+import time
+
+parser = argparse.ArgumentParser(description="Genetic algorithm class scheduling with a live view of the best schedule.")
+parser.add_argument("scenario", nargs="?", help="scenario file to load instead of random data (see scenario.py)")
+parser.add_argument("--mode", choices=MODES, default="realtime",
+                    help="realtime runs a generation every generation_delay, turbo runs --turbo-steps per frame, "
+                         "headless runs every generation without a window")
+parser.add_argument("--turbo-steps", type=int, default=10, help="generations per frame in turbo mode")
+parser.add_argument("--render-every", type=int, default=1, help="draw only every Nth frame")
+parser.add_argument("--local-search", type=int, default=0, metavar="MOVES",
+                    help="memetic step: reassign up to MOVES classes of the best schedules every generation")
+parser.add_argument("--durations", action="store_true",
+                    help="count conflicts over every hour of a class, including double-booked students")
+args = parser.parse_args()
+if args.durations and args.local_search:
+    parser.error("--local-search needs the default fitness: with --durations a class's score depends on the others")
+if args.mode == "headless":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Initialize Pygame
+pygame.init()
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 800  # Increased height to accommodate updates below the grid
+screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+pygame.display.set_caption("Class Scheduling Visualization")
+font = pygame.font.Font(None, 24)
+
+# Environment setup
+if args.scenario:
+    environment = load_environment(args.scenario)  # python run.py instance.scn runs a saved scenario
+    num_classes, num_students = environment.num_classes, environment.num_students
+else:
+    num_classes = 8
+    num_students = 5
+    environment = Environment(num_classes, num_students)
+class_assignments = environment.generate_assignments()
+
+# Initialize agents (students)
+availabilities = environment.student_availabilities  # Unpacked from the availability masks once
+agents = [Agent(id=i, availability=availabilities[i], preferences=environment.student_preferences[i]) for i in range(num_students)]
+
+# Genetic Algorithm parameters
+population_size = 50
+mutation_rate = 0.1
+n_generations = 100
+fitness_cache = FitnessCache(environment, durations=args.durations)  # Scores of every genome seen, so each is computed once
+delta_fitness = DeltaFitness(environment)  # O(1) fitness changes, for the local search
+local_search_rows = 5  # Best schedules refined each generation with --local-search
+generation_delay = 1000  # Milliseconds per generation in realtime mode, for visualization
+sim_clock = SimulationClock(generation_delay / 1000, args.mode, args.turbo_steps, args.render_every)
+
+# Updates list to display below the grid
+updates = []
+max_updates = 5  # Max number of updates to display at once
+
+# Initialize population (individuals x classes array of assigned students)
+population = environment.generate_assignments(population_size)
+breeder = Breeder(population, num_students, mutation_rate)  # Breeds each generation in place of the one before last
+population = breeder.population
+scores = fitness_cache.scores(population)
+
+# Main loop for genetic algorithm and visualization
+running = True
+best_solution = None
+best_fitness = float('inf')
+generation_count = 0
+current_best = None  # Best schedule of the latest generation
+redraw = False  # Whether generations ran since the screen was last drawn
+max_fitness_achieved = float('inf')  # Variable to track the max fitness achieved
+
+start_time = time.perf_counter()
+while running and generation_count < n_generations:
+    steps = sim_clock.tick()  # Waits for the next frame, except when headless
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+
+    # Genetic Algorithm Step-by-Step per Generation
+    for _ in range(min(steps, n_generations - generation_count)):
+        # Select the fitter half as parents, then fill the next generation with their mutated children
+        population = breeder.breed(scores)
+        scores = fitness_cache.scores(population)
+
+        # Memetic step: refine the best schedules, then rescore them so their scores stay the
+        # exact population_fitness values rather than sums of float deltas
+        if args.local_search:
+            elites = np.argpartition(scores, min(local_search_rows, population_size) - 1)[:local_search_rows]
+            delta_fitness.refine(population, elites, args.local_search)
+            scores[elites] = fitness_cache.scores(population[elites])
+
+        # Find the best solution in the current generation
+        current_best = population[np.argmin(scores)].copy()  # The first of any ties, like min()
+        current_fitness = scores.min()
+        if current_fitness < best_fitness:
+            best_fitness = current_fitness
+            best_solution = current_best
+
+        # Track max fitness achieved
+        if current_fitness < max_fitness_achieved:
+            max_fitness_achieved = current_fitness
+
+        # Add update for the current generation to the updates list
+        update_text = f"Generation {generation_count + 1}: Best Fitness = {best_fitness:.2f}"
+        updates.append(update_text)
+        if len(updates) > max_updates:
+            updates.pop(0)
+
+        generation_count += 1
+        redraw = True
+
+    if not redraw or not sim_clock.render_due():
+        continue
+    redraw = False
+
+    # Draw current generation's best solution on the grid
+    environment.draw_grid(screen, font, current_best)
+
+    # Display generation and fitness info on the right panel
+    generation_text = font.render(f"Generation: {generation_count}", True, (0, 0, 0))
+    fitness_text = font.render(f"Best Fitness (Current): {best_fitness:.2f}", True, (0, 0, 0))
+    max_fitness_text = font.render(f"Max Fitness Achieved: {max_fitness_achieved:.2f}", True, (0, 0, 0))
+
+    screen.blit(generation_text, (SCREEN_WIDTH - 300, 50))
+    screen.blit(fitness_text, (SCREEN_WIDTH - 300, 80))
+    screen.blit(max_fitness_text, (SCREEN_WIDTH - 300, 110))
+    cache_text = font.render(f"Fitness Cache Hits: {100 * fitness_cache.hit_rate:.0f}%", True, (0, 0, 0))
+    screen.blit(cache_text, (SCREEN_WIDTH - 300, 140))
+
+    # Display the list of updates below the grid
+    update_start_y = 500
+    for i, update in enumerate(updates):
+        update_surface = font.render(update, True, (0, 0, 0))
+        screen.blit(update_surface, (50, update_start_y + i * 25))
+
+    pygame.display.flip()
+
+if sim_clock.headless:
+    print(f"{generation_count} generations, best fitness {best_fitness:.2f} "
+          f"in {time.perf_counter() - start_time:.3f}s, "
+          f"{fitness_cache.misses} genomes scored, {100 * fitness_cache.hit_rate:.0f}% fitness cache hits")
+    running = False
+
+# Keep window open after completion
+while running:
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            running = False
+
+pygame.quit()
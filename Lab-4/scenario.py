@@ -0,0 +1,117 @@
+# scenario.py
+"""
+Save and load Lab-4 scheduling instances as binary scenario files, so a run can be reproduced.
+
+A scenario file is a short header followed by the raw arrays, in the layout of the
+Lab-3 scenario files:
+
+    magic (8 bytes) | format version (uint32) | header length (uint32) | JSON header | arrays
+
+The JSON header names every array with its dtype, shape and byte offset. Lab-4 arrays
+are small (28 bytes per student), so they are written back to back and read into memory
+at once; files written by older versions, with aligned offsets, read the same way.
+
+Format versions:
+    1  student_availabilities as a (students x 24) 0/1 matrix, int64 preferences
+    2  availability_masks, one 24-bit mask per student, and uint8 preferences
+
+Example:
+    python scenario.py save instances/big.scn --classes 500 --students 2000 --seed 1
+    python scenario.py info instances/big.scn
+    python run.py instances/big.scn
+"""
+import argparse
+import json
+import struct
+
+import numpy as np
+
+from environment import Environment, pack_availabilities
+
+MAGIC = b"CSE366SC"
+FORMAT_VERSION = 2
+PREAMBLE = struct.Struct("<8sII")  # Magic, format version, header length
+KIND = "lab4-schedule"
+ARRAYS = ("class_durations", "class_priorities", "availability_masks", "student_preferences", "pref")
+LEGACY_ARRAYS = ("class_durations", "class_priorities", "student_availabilities", "student_preferences", "pref")
+
+
+def write_arrays(path, arrays, **meta):
+    """Write named numpy arrays and a few JSON-serializable values to a scenario file."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    entries = []
+    offset = 0
+    for name, array in arrays.items():
+        entries.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += array.nbytes
+    header = json.dumps({"kind": KIND, "meta": meta, "arrays": entries}).encode()
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for array in arrays.values():
+            f.write(array.tobytes())
+
+
+def read_arrays(path):
+    """Read a scenario file and return its format version, JSON header and arrays (read-only)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < PREAMBLE.size or data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a scenario file")
+    _, version, length = PREAMBLE.unpack_from(data)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{path} uses scenario format {version}, newer than the supported {FORMAT_VERSION}")
+    header = json.loads(data[PREAMBLE.size:PREAMBLE.size + length])
+    if header["kind"] != KIND:
+        raise ValueError(f"{path} holds a {header['kind']} scenario, not {KIND}")
+    start = PREAMBLE.size + length
+    arrays = {}
+    for entry in header["arrays"]:
+        dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+        count = int(np.prod(shape))
+        array = np.frombuffer(data, dtype, count, start + entry["offset"]) if count else np.empty(0, dtype)
+        arrays[entry["name"]] = array.reshape(shape)
+    return version, header, arrays
+
+
+def save_environment(environment, path, **meta):
+    """Save the class and student arrays of an environment."""
+    write_arrays(path, {name: getattr(environment, name) for name in ARRAYS}, **meta)
+
+
+def load_environment(path):
+    """Load an environment saved with save_environment. Its arrays are read-only."""
+    version, _, arrays = read_arrays(path)
+    missing = [name for name in (ARRAYS if version >= 2 else LEGACY_ARRAYS) if name not in arrays]
+    if missing:
+        raise ValueError(f"{path} is missing {', '.join(missing)}")
+    if version < 2:
+        # Version 1 holds the full 0/1 matrix and int64 preferences; convert to what Environment stores
+        arrays["availability_masks"] = pack_availabilities(arrays.pop("student_availabilities"))
+        arrays["student_preferences"] = arrays["student_preferences"].astype(np.uint8)
+    return Environment.from_arrays(*(arrays[name] for name in ARRAYS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and inspect Lab-4 scenario files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    save = commands.add_parser("save", help="generate a seeded instance and save it")
+    save.add_argument("path")
+    save.add_argument("--classes", type=int, default=8)
+    save.add_argument("--students", type=int, default=5)
+    save.add_argument("--seed", type=int, default=0)
+    info = commands.add_parser("info", help="print the header of a scenario file")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "save":
+        np.random.seed(args.seed)
+        save_environment(Environment(args.classes, args.students), args.path, seed=args.seed)
+    version, header, _ = read_arrays(args.path)
+    print(f"{args.path}: {header['kind']} format {version} {json.dumps(header['meta'])}")
+    for entry in header["arrays"]:
+        print(f"  {entry['name']}: {entry['dtype']} {tuple(entry['shape'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# test_genetic.py
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pytest
+
+from environment import Environment
+from genetic import population_fitness
+
+
+def fitness(environment, individual):
+    """The original per-individual fitness loop from run.py."""
+    conflict_penalty = 0
+    preference_penalty = 0
+    for class_id, student in enumerate(individual):
+        slot = class_id % 24
+        if environment.student_availabilities[student, slot] == 0:
+            conflict_penalty += 1
+        preference_penalty += 1 / max(1, environment.student_preferences[student, slot])
+    return conflict_penalty + preference_penalty
+
+
+@pytest.mark.parametrize("num_classes, num_students", [(1, 1), (8, 5), (30, 7), (75, 20)])
+@pytest.mark.parametrize("seed", range(5))
+def test_population_fitness_matches_the_original_loop(num_classes, num_students, seed):
+    np.random.seed(seed)
+    environment = Environment(num_classes, num_students)
+    population = environment.generate_assignments(40)
+    expected = [fitness(environment, individual) for individual in population]
+    assert population_fitness(environment, population).tolist() == expected
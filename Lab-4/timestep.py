@@ -0,0 +1,54 @@
+# timestep.py
+"""
+Fixed-timestep clock that separates simulation steps from rendered frames.
+
+Modes:
+    realtime  one step per frame once step_time seconds of wall time have passed, frames limited to fps
+    turbo     turbo_steps steps every frame, frames still limited to fps
+    headless  no frames at all: every tick returns a batch of steps at once, without waiting
+
+In every mode only every render_every-th frame needs drawing.
+"""
+import time
+
+import pygame
+
+MODES = ("realtime", "turbo", "headless")
+
+
+class SimulationClock:
+    def __init__(self, step_time, mode="realtime", turbo_steps=20, render_every=1, fps=60):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.step_time = step_time  # Seconds of wall time per step in realtime mode
+        self.mode = mode
+        self.turbo_steps = turbo_steps  # Steps per frame in turbo mode, and per tick when headless
+        self.render_every = max(1, render_every)
+        self.fps = fps
+        self.frame_clock = pygame.time.Clock() if mode != "headless" else None
+        self.frames = 0
+        self.steps = 0  # Steps handed out so far
+        self.last_step = time.perf_counter()  # Wall time of the last realtime step
+
+    @property
+    def headless(self):
+        return self.mode == "headless"
+
+    def tick(self):
+        """Wait for the next frame (except when headless) and return how many steps to run in it."""
+        if self.frame_clock:
+            self.frame_clock.tick(self.fps)
+        self.frames += 1
+        if self.mode == "realtime":
+            now = time.perf_counter()
+            steps = int(now - self.last_step >= self.step_time)
+            if steps:
+                self.last_step = now
+        else:
+            steps = self.turbo_steps
+        self.steps += steps
+        return steps
+
+    def render_due(self):
+        """Whether the current frame should be drawn."""
+        return not self.headless and self.frames % self.render_every == 0